@@ -0,0 +1,204 @@
+"""
+Benchmark Suite for Lab Programs
+Generates the datasets at several sizes and times every stage (generation,
+CSV load and each program's work) without any windows or prompts,
+recording wall time, the program's own profiled stages (groupby, corr,
+fit, render, detect, ...) and peak memory to a JSON file that later runs
+can be compared against to catch regressions
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from profiling import Profiler
+
+STAGES = ['generate', 'load', 'program1', 'program2', 'program3', 'program4']
+DATASETS = ['employees', 'sales', 'products', 'monthly_performance']
+DEFAULT_SIZES = [1_000, 100_000]
+# A stage counts as a regression when it is this much slower than the baseline
+DEFAULT_THRESHOLD = 1.25
+
+def generator_argv(size):
+    """Generator options giving each dataset about size rows"""
+    return ['--rows', str(size), '--products', str(size),
+            '--sales-months', str(max(12, size // 3)),
+            '--months', '12', '--stores', str(max(1, size // 12)),
+            '--stream']
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _setup(stage, figure_dir):
+    """Load what a stage needs before it is timed; returns the call to time"""
+    import generate_datasets
+    from data_loader import load_dataset
+    if stage == 'generate':
+        return lambda size: generate_datasets.main(generator_argv(size))
+    if stage == 'load':
+        return lambda size: [load_dataset(name) for name in DATASETS]
+    
+    from rendering import use_headless
+    use_headless()
+    if stage == 'program1':
+        import program1_data_exploration as program
+        df = load_dataset('employees')
+        return lambda size: program.main([], df=df)
+    if stage == 'program2':
+        import program2_analytics_types as program
+        df = load_dataset('sales')
+        return lambda size: program.main([], df=df)
+    if stage == 'program3':
+        import program3_visualizations as program
+        df = load_dataset('products')
+        return lambda size: program.main(['--output-dir', figure_dir], df=df)
+    if stage == 'program4':
+        import program4_root_cause_analysis as program
+        df = load_dataset('monthly_performance')
+        argv = ['--by', 'Store'] if 'Store' in df.columns else []
+        return lambda size: program.main(argv, df=df)
+    raise ValueError(f"unknown stage {stage!r}")
+
+def _run_stage(stage, size, data_dir):
+    """Body of the child process: set up, then time one stage with output discarded.
+    
+    The run is profiled for stage times only (no cProfile), so the stages
+    the program marks with profiling.stage are broken out at little cost.
+    """
+    os.chdir(data_dir)
+    with contextlib.redirect_stdout(io.StringIO()), \
+            tempfile.TemporaryDirectory(prefix='benchmark_figures_') as figure_dir:
+        run = _setup(stage, figure_dir)
+        setup_rss = peak_rss_mb()
+        start = time.perf_counter()
+        with Profiler(stage, calls=False) as profiler:
+            run(size)
+        seconds = time.perf_counter() - start
+    # Inclusive seconds per nested stage path, e.g. "program4;grouped;detect"
+    stages = {entry['path']: entry['seconds'] for entry in profiler.report()['stages']
+              if entry['path'] != stage}
+    return {'seconds': seconds, 'stages': stages, 'peak_rss_mb': peak_rss_mb(),
+            'setup_rss_mb': setup_rss}
+
+def run_stage(stage, size, data_dir):
+    """Run one stage in a fresh process, so its peak memory is its own"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(1, mp_context=context) as pool:
+        return pool.submit(_run_stage, stage, size, os.path.abspath(data_dir)).result()
+
+def run_benchmarks(sizes, stages, work_dir, repeat=1):
+    """Time every stage at every size; returns a list of result records"""
+    results = []
+    for size in sizes:
+        data_dir = os.path.join(work_dir, f'size_{size}')
+        os.makedirs(data_dir, exist_ok=True)
+        if 'generate' not in stages and not os.path.exists(os.path.join(data_dir, 'sales_data.csv')):
+            run_stage('generate', size, data_dir)
+        for stage in stages:
+            runs = [run_stage(stage, size, data_dir) for _ in range(repeat)]
+            fastest = min(runs, key=lambda run: run['seconds'])
+            record = {
+                'size': size,
+                'stage': stage,
+                'seconds': fastest['seconds'],
+                'all_seconds': [run['seconds'] for run in runs],
+                'stages': fastest['stages'],
+                'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+                'setup_rss_mb': max(run['setup_rss_mb'] for run in runs),
+            }
+            results.append(record)
+            print(f"  {size:>12,} rows  {stage:<10} {record['seconds']:>9.3f}s "
+                  f"{record['peak_rss_mb']:>9.1f} MB peak", flush=True)
+            for path, seconds in record['stages'].items():
+                print(f"{'':<30}{path.split(';', 1)[1]:<24} {seconds:>8.3f}s")
+    return results
+
+def environment():
+    """Versions and machine details stored with the results"""
+    import numpy as np
+    import pandas as pd
+    import matplotlib
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print each stage against a baseline run; returns the regressed (size, stage) pairs"""
+    previous = {(r['size'], r['stage']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'size':>12}  {'stage':<10} {'baseline':>9} {'now':>9} {'ratio':>7} "
+          f"{'MB base':>9} {'MB now':>9}")
+    for record in results:
+        key = (record['size'], record['stage'])
+        old = previous.get(key)
+        if old is None:
+            continue
+        ratio = record['seconds'] / old['seconds'] if old['seconds'] > 0 else float('inf')
+        flag = ''
+        if ratio > threshold or record['peak_rss_mb'] > old['peak_rss_mb'] * threshold:
+            regressions.append(key)
+            flag = '  ⚠️ regression'
+        print(f"{record['size']:>12,}  {record['stage']:<10} {old['seconds']:>8.3f}s "
+              f"{record['seconds']:>8.3f}s {ratio:>6.2f}x {old['peak_rss_mb']:>9.1f} "
+              f"{record['peak_rss_mb']:>9.1f}{flag}")
+    return regressions
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the lab programs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="approximate rows per dataset, e.g. 1000 1000000 100000000 "
+                             "(default: 1000 100000)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help="stages to time (default: all)")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="runs per stage; the fastest is recorded (default: 1)")
+    parser.add_argument('--work-dir', default='benchmark_data',
+                        help="where the generated datasets are kept (default: benchmark_data)")
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="JSON results file (default: benchmark_results.json)")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="JSON results of an earlier run to check for regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown or memory growth ratio counted as a regression "
+                             f"(default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"Benchmarking {', '.join(args.stages)} at {', '.join(f'{s:,}' for s in args.sizes)} rows")
+    results = run_benchmarks(args.sizes, args.stages, args.work_dir, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f"✓ Saved {len(results)} results to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} stage(s) regressed by more than "
+                             f"{args.threshold:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Shared Data Loader for Lab Programs
+Loads the generated datasets with the compact dtypes from data_schema,
+preferring the columnar Parquet/Feather files over CSV when they are
+available and up to date
+"""
+
+import os
+import pandas as pd
+from data_schema import apply_schema, dtypes_for
+from profiling import stage
+
+# Dataset name -> file name without extension
+DATASETS = {
+    'employees': 'employees_data',
+    'sales': 'sales_data',
+    'products': 'products_data',
+    'monthly_performance': 'monthly_performance',
+}
+
+# Output format -> file extension
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Binary formats are tried before falling back to CSV
+BINARY_FORMATS = ['parquet', 'feather']
+
+def require_pyarrow():
+    """Import pyarrow, which Parquet/Feather support needs"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet/Feather files need pyarrow: uv add pyarrow") from None
+    return pyarrow
+
+def dataset_path(name, fmt='csv', data_dir='.'):
+    """Path of a dataset file in the given format"""
+    return os.path.join(data_dir, DATASETS[name] + FORMATS[fmt])
+
+def find_dataset(name, data_dir='.'):
+    """Return (path, format) of the file to load for a dataset.
+    
+    A Parquet/Feather file wins unless the CSV has been written after it,
+    so regenerating only the CSV never leaves a stale binary file in use.
+    """
+    csv_path = dataset_path(name, 'csv', data_dir)
+    csv_mtime = os.path.getmtime(csv_path) if os.path.exists(csv_path) else None
+    for fmt in BINARY_FORMATS:
+        path = dataset_path(name, fmt, data_dir)
+        if os.path.exists(path) and (csv_mtime is None or os.path.getmtime(path) >= csv_mtime):
+            return path, fmt
+    if csv_mtime is None:
+        raise FileNotFoundError(f"{csv_path} not found - run generate_datasets.py first")
+    return csv_path, 'csv'
+
+def dataset_columns(name, data_dir='.'):
+    """Column names of a dataset's file, read from its header or schema only"""
+    path, fmt = find_dataset(name, data_dir)
+    if fmt == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = require_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return pa.ipc.open_file(pa.memory_map(path)).schema.names
+
+@stage('load')
+def load_dataset(name, columns=None, data_dir='.'):
+    """Load a dataset reading only the requested columns, typed by data_schema"""
+    path, fmt = find_dataset(name, data_dir)
+    dtypes = dtypes_for(name, columns)
+    
+    if fmt == 'csv':
+        df = pd.read_csv(path, usecols=columns, dtype=dtypes)
+        # Optional schema columns (Year) may be missing when reading everything
+        return df if columns is None else df[columns]
+    
+    require_pyarrow()
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_feather(path, columns=columns)
+    return apply_schema(df, name)
+
+def iter_dataset(name, columns=None, chunksize=100_000, data_dir='.'):
+    """Yield a dataset as typed DataFrame chunks without loading the whole file"""
+    path, fmt = find_dataset(name, data_dir)
+    dtypes = dtypes_for(name, columns)
+    
+    if fmt == 'csv':
+        for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+            yield chunk if columns is None else chunk[columns]
+        return
+    
+    pa = require_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        if columns is not None:
+            batches = (batch.select(columns) for batch in batches)
+    for batch in batches:
+        yield apply_schema(batch.to_pandas(), name)
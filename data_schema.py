@@ -0,0 +1,92 @@
+"""
+Dataset Schema for Lab Programs
+Declares the compact dtype of every column in the four datasets
+"""
+
+import numpy as np
+import pandas as pd
+
+MONTHS_SHORT = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+MONTHS_FULL = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+# Months are ordered categoricals, so they sort and group in calendar order
+# (not alphabetically) and their codes are the month numbers 0-11
+SALES_MONTH = pd.CategoricalDtype(MONTHS_SHORT, ordered=True)
+PERFORMANCE_MONTH = pd.CategoricalDtype(MONTHS_FULL, ordered=True)
+
+# Integer widths are chosen from the generator's value ranges, e.g. Age is
+# always 24-49 and fits int8. Repeated strings (departments, products,
+# categories, months, names) are stored once as categories. Year is only
+# written for datasets that span more than twelve months, Store only for
+# performance data of more than one store.
+SCHEMA = {
+    'employees': {
+        'Employee_ID': str,
+        'Name': 'category',
+        'Department': 'category',
+        'Age': 'int8',
+        'Salary': 'int32',
+        'Experience_Years': 'int8',
+    },
+    'sales': {
+        'Year': 'int16',
+        'Month': SALES_MONTH,
+        'Product': 'category',
+        'Sales': 'int32',
+        'Profit': 'int32',
+        'Marketing_Spend': 'int32',
+        'Customer_Count': 'int32',
+    },
+    'products': {
+        'Product_Name': str,
+        'Price': 'int32',
+        'Category': 'category',
+        'Sales_Count': 'int32',
+    },
+    'monthly_performance': {
+        'Store': 'category',
+        'Year': 'int16',
+        'Month': PERFORMANCE_MONTH,
+        'Revenue': 'int32',
+        # Kept at float64: month-over-month diffs are compared against a
+        # -0.3 threshold and float32 rounding would flip borderline months
+        'Customer_Satisfaction': 'float64',
+        'Marketing_Budget': 'int32',
+        'Returns': 'int16',
+        'Support_Tickets': 'int16',
+    },
+}
+
+def dtypes_for(name, columns=None):
+    """Column -> dtype mapping for a dataset, optionally limited to some columns"""
+    dtypes = SCHEMA[name]
+    if columns is None:
+        return dict(dtypes)
+    return {col: dtypes[col] for col in columns}
+
+def apply_schema(df, name):
+    """Cast a DataFrame to the schema of a dataset.
+    
+    Unordered categoricals keep only the values that occur, in sorted order,
+    which is what read_csv infers, so CSV and binary files and in-memory
+    data group and sort the same way.
+    """
+    df = df.astype(dtypes_for(name, df.columns))
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+            values = df[col].cat.remove_unused_categories()
+            df[col] = values.cat.reorder_categories(sorted(values.cat.categories))
+    return df
+
+def month_number(months, years=None):
+    """Chronological month number (year * 12 + month) of Month values.
+    
+    Uses the integer codes of an ordered Month column; without a Year
+    column all months are taken to be from the same year.
+    """
+    number = np.asarray(months.cat.codes, dtype='int64')
+    if years is not None:
+        number = number + 12 * np.asarray(years, dtype='int64')
+    return number
@@ -0,0 +1,10 @@
+"""
+Performance Drop Rules
+Thresholds shared by the batch root cause analysis (Program 4) and the
+streaming alert detector
+"""
+
+# A month is flagged when revenue falls by more than 5% or satisfaction
+# by more than 0.3 points against the previous month
+REVENUE_THRESHOLD = -5
+SATISFACTION_THRESHOLD = -0.3
@@ -0,0 +1,111 @@
+"""
+Batched Forecasting for Lab Programs
+Least-squares models for many series at once: all series are stacked into
+3-D NumPy arrays and solved, predicted and scored together, so forecasting
+thousands of products or regions costs no Python loop per series
+"""
+
+import numpy as np
+import pandas as pd
+
+def panel_arrays(df, series, times, columns):
+    """Stack a long DataFrame into (n_series, n_times, n_columns) arrays.
+    
+    series lists the key columns that identify a series (e.g. Product,
+    Region) and times gives each row's integer time index. Cells that a
+    series has no row for are NaN and False in the returned mask.
+    Returns (keys, times, values, mask) with keys as a DataFrame.
+    """
+    index = pd.MultiIndex.from_frame(df[series])
+    keys = index.unique().sort_values()
+    series_codes = keys.get_indexer(index)
+    time_codes, time_values = pd.factorize(np.asarray(times), sort=True)
+    
+    values = np.full((len(keys), len(time_values), len(columns)), np.nan)
+    values[series_codes, time_codes] = df[columns].to_numpy(dtype='float64')
+    mask = np.zeros(values.shape[:2], dtype=bool)
+    mask[series_codes, time_codes] = True
+    return keys.to_frame(index=False), time_values, values, mask
+
+def _weights(y, mask):
+    """0/1 observation weights, all ones when there is no mask"""
+    if mask is None:
+        return np.ones(np.shape(y))
+    return np.asarray(mask, dtype='float64')
+
+def _weighted_mean(values, w):
+    """Mean over the observation axis (1) counting only weighted observations"""
+    n = w.sum(axis=1)
+    n = np.where(n > 0, n, 1)
+    if values.ndim == 3:
+        return (values * w[..., None]).sum(axis=1) / n[:, None]
+    return (values * w).sum(axis=1) / n
+
+class BatchedLinearRegression:
+    """Ordinary least squares with an intercept, fitted to every series at once.
+    
+    X has shape (n_series, n_obs, n_features) and y (n_series, n_obs).
+    Each series is centred and solved with one batched pseudo-inverse,
+    which gives the same minimum-norm solution as sklearn's LinearRegression.
+    Observations where mask is False (gaps in a series) are ignored.
+    """
+    
+    def fit(self, X, y, mask=None):
+        w = _weights(y, mask)
+        # Zero the gaps so their NaNs cannot leak into the weighted sums
+        X = np.where(w[..., None] > 0, X, 0.0)
+        y = np.where(w > 0, y, 0.0)
+        x_mean = _weighted_mean(X, w)
+        y_mean = _weighted_mean(y, w)
+        X_centred = (X - x_mean[:, None, :]) * w[..., None]
+        y_centred = (y - y_mean[:, None]) * w
+        
+        self.coef_ = np.einsum('sfn,sn->sf', np.linalg.pinv(X_centred), y_centred)
+        self.intercept_ = y_mean - np.einsum('sf,sf->s', x_mean, self.coef_)
+        return self
+    
+    def fit_moments(self, moments, target):
+        """Fit from CoMoments accumulators (one per series) instead of raw rows.
+        
+        The target column is regressed on every other column of the
+        accumulators, so a model can be kept up to date by adding and
+        removing observations without rescanning them. Also sets r2_, the
+        R² per series that score() would return on the accumulated rows.
+        """
+        columns = moments[0].columns
+        t = columns.index(target)
+        features = [i for i in range(len(columns)) if i != t]
+        M = np.stack([m.comoment for m in moments])
+        mean = np.stack([m.mean for m in moments])
+        Mxx = M[:, features][:, :, features]
+        Mxy = M[:, features, t]
+        
+        # Solve on the correlation scale; raw co-moments mix very different units
+        scale = np.sqrt(np.einsum('sii->si', Mxx))
+        scale = np.where(scale > 0, scale, 1.0)
+        R = Mxx / (scale[:, :, None] * scale[:, None, :])
+        self.coef_ = np.einsum('sfg,sg->sf', np.linalg.pinv(R, hermitian=True),
+                               Mxy / scale) / scale
+        self.intercept_ = mean[:, t] - np.einsum('sf,sf->s', mean[:, features], self.coef_)
+        
+        ss_tot = M[:, t, t]
+        ss_res = np.maximum(ss_tot - np.einsum('sf,sf->s', self.coef_, Mxy), 0.0)
+        safe_tot = np.where(ss_tot > 0, ss_tot, 1.0)
+        self.r2_ = np.where(ss_tot > 0, 1 - ss_res / safe_tot, np.where(ss_res > 0, 0.0, 1.0))
+        return self
+    
+    def predict(self, X):
+        """Predictions of shape (n_series, n_obs), e.g. a whole forecast horizon"""
+        return np.einsum('snf,sf->sn', X, self.coef_) + self.intercept_[:, None]
+    
+    def score(self, X, y, mask=None):
+        """R² of every series, with LinearRegression.score's convention for constant y"""
+        w = _weights(y, mask)
+        y = np.where(w > 0, y, 0.0)
+        prediction = self.predict(np.where(w[..., None] > 0, X, 0.0))
+        residual = ((y - prediction) * w) ** 2
+        total = ((y - _weighted_mean(y, w)[:, None]) * w) ** 2
+        ss_res = residual.sum(axis=1)
+        ss_tot = total.sum(axis=1)
+        safe_tot = np.where(ss_tot > 0, ss_tot, 1.0)
+        return np.where(ss_tot > 0, 1 - ss_res / safe_tot, np.where(ss_res > 0, 0.0, 1.0))
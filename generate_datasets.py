@@ -3,169 +3,442 @@ Dataset Generator for Lab Assignment
 Creates synthetic datasets for all lab programs
 """
 
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import random
+from data_loader import FORMATS, dataset_path, require_pyarrow
+from data_schema import PERFORMANCE_MONTH, SALES_MONTH, apply_schema
 
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+DEPARTMENTS = ['IT', 'HR', 'Finance', 'Marketing', 'Sales']
+FIRST_NAMES = ['John', 'Sarah', 'Michael', 'Emily', 'David', 'Jessica', 'Daniel', 
+               'Lisa', 'James', 'Maria', 'Robert', 'Jennifer', 'Christopher', 
+               'Amanda', 'Matthew', 'Ashley', 'Joshua', 'Stephanie', 'Andrew', 
+               'Elizabeth', 'Ryan', 'Michelle', 'Kevin', 'Laura', 'Brian']
+LAST_NAMES = ['Smith', 'Johnson', 'Brown', 'Davis', 'Wilson', 'Martinez', 
+              'Anderson', 'Taylor', 'Thomas', 'Garcia', 'Rodriguez', 'Lee', 
+              'White', 'Harris', 'Clark', 'Lewis', 'Robinson', 'Walker', 
+              'Hall', 'Allen', 'Young', 'King', 'Wright', 'Lopez', 'Hill']
+# Every "First Last" combination, indexed by first_idx * len(LAST_NAMES) + last_idx
+FULL_NAMES = [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES]
 
-def generate_employees_dataset():
+SALES_PRODUCTS = ['Laptop', 'Phone', 'Tablet']
+
+PRODUCT_CATALOGUE = pd.DataFrame({
+    'Product_Name': [
+        'Gaming Laptop', 'Business Laptop', 'Smartphone Pro', 'Smartphone Lite',
+        'Tablet Premium', 'Tablet Basic', 'Wireless Headphones', 'Bluetooth Speaker',
+        'Smart Watch', 'Fitness Tracker', 'Laptop Bag', 'Phone Case',
+        'Screen Protector', 'USB Cable', 'Power Bank', 'Wireless Mouse',
+        'Keyboard', 'Webcam', 'External SSD', 'Monitor'
+    ],
+    'Price': [1299, 899, 799, 399, 599, 299, 199, 149, 
+              349, 129, 49, 25, 15, 12, 45, 35, 79, 89, 159, 299],
+    'Category': ['Electronics', 'Electronics', 'Electronics', 'Electronics',
+                 'Electronics', 'Electronics', 'Accessories', 'Accessories',
+                 'Electronics', 'Electronics', 'Accessories', 'Accessories',
+                 'Accessories', 'Accessories', 'Accessories', 'Accessories',
+                 'Accessories', 'Accessories', 'Accessories', 'Electronics']
+})
+
+# Calendar year of the first generated month; datasets longer than twelve
+# months get a Year column so repeated month names stay distinguishable
+FIRST_YEAR = 2024
+
+# Rows are drawn in fixed blocks, each with its own random stream.
+# Chunks are cut from the block stream afterwards, so neither the chunk
+# size nor the number of worker processes changes which values a row gets.
+BLOCK_SIZE = 100_000
+
+# Index of each dataset's stream in SeedSequence(seed).spawn(4)
+EMPLOYEES, SALES, PRODUCTS, MONTHLY_PERFORMANCE = range(4)
+
+def _block_seeds(seed, dataset, n_blocks):
+    """Spawn one SeedSequence per block from the dataset's own stream"""
+    return np.random.SeedSequence(seed).spawn(4)[dataset].spawn(n_blocks)
+
+def _block_tasks(make_block, seed, dataset, n_units, units_per_block, **kwargs):
+    """Split n_units into blocks and return one picklable task per block"""
+    starts = range(0, n_units, units_per_block)
+    seeds = _block_seeds(seed, dataset, len(starts))
+    return [partial(make_block, seq, start, min(start + units_per_block, n_units), **kwargs)
+            for seq, start in zip(seeds, starts)]
+
+def _format_ids(prefix, numbers, width):
+    """Build zero-padded IDs like 'E001' with array arithmetic instead of f-strings"""
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    digits = (numbers[:, None] // powers) % 10 + ord('0')
+    chars = np.empty((len(numbers), width + len(prefix)), dtype=np.uint8)
+    chars[:, :len(prefix)] = np.frombuffer(prefix.encode(), dtype=np.uint8)
+    chars[:, len(prefix):] = digits
+    return chars.view(f'S{chars.shape[1]}').ravel().astype(f'U{chars.shape[1]}')
+
+def _rechunk(frames, chunk_size):
+    """Re-slice a stream of DataFrames into chunks of exactly chunk_size rows"""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    pending = []
+    pending_rows = 0
+    for frame in frames:
+        pending.append(frame)
+        pending_rows += len(frame)
+        while pending_rows >= chunk_size:
+            merged = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            yield merged.iloc[:chunk_size].reset_index(drop=True)
+            rest = merged.iloc[chunk_size:]
+            pending = [rest] if len(rest) else []
+            pending_rows = len(rest)
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+def write_chunks(chunks, path, fmt='csv'):
+    """Stream DataFrame chunks into one CSV/Parquet/Feather file and return the row count"""
+    rows = 0
+    if fmt == 'csv':
+        with open(path, 'w', newline='') as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, index=False, header=(i == 0))
+                rows += len(chunk)
+        return rows
+    
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if fmt == 'parquet':
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    # Feather v2 is the Arrow IPC file format
+                    writer = pa.ipc.new_file(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def _run_task(task, as_csv, header):
+    """Worker entry point: build one block, optionally already rendered as CSV"""
+    frame = task()
+    if as_csv:
+        return len(frame), frame.to_csv(index=False, header=header)
+    return frame
+
+def _ordered_results(executor, tasks, as_csv):
+    """Run tasks on the pool and yield their results in task order.
+    
+    Only a few blocks per worker are in flight at once, so memory stays
+    bounded even when the writer is slower than the workers.
+    """
+    window = 2 * (os.cpu_count() or 1)
+    pending = []
+    for i, task in enumerate(tasks):
+        pending.append(executor.submit(_run_task, task, as_csv, i == 0))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+def _save(tasks, name, stream, chunk_size, executor=None, fmt='csv'):
+    """Write a dataset either chunk by chunk or as one in-memory DataFrame"""
+    path = dataset_path(name, fmt)
+    if executor is not None and stream and fmt == 'csv':
+        # Workers render CSV text, so the parent only appends bytes in order
+        rows = 0
+        with open(path, 'w', newline='') as f:
+            for n_rows, text in _ordered_results(executor, tasks, as_csv=True):
+                f.write(text)
+                rows += n_rows
+        print(f"✓ Created {path} with {rows} records (streamed)\n")
+        return None
+    if executor is not None:
+        blocks = _ordered_results(executor, tasks, as_csv=False)
+    else:
+        blocks = (task() for task in tasks)
+    chunks = _rechunk(blocks, chunk_size)
+    if stream:
+        rows = write_chunks(chunks, path, fmt)
+        print(f"✓ Created {path} with {rows} records (streamed)\n")
+        return None
+    df = pd.concat(chunks, ignore_index=True)
+    if fmt == 'parquet':
+        require_pyarrow()
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        require_pyarrow()
+        df.to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    print(f"✓ Created {path} with {len(df)} records\n")
+    return df
+
+# -----------------------------------------------------------------
+# Employees (Program 1)
+# -----------------------------------------------------------------
+
+def _employee_block(seq, start, stop, id_width):
+    """Generate employees start..stop-1 (one block) fully vectorized"""
+    rng = np.random.default_rng(seq)
+    size = stop - start
+    
+    first_idx = rng.integers(0, len(FIRST_NAMES), size)
+    last_idx = rng.integers(0, len(LAST_NAMES), size)
+    dept_idx = rng.integers(0, len(DEPARTMENTS), size)
+    age = rng.integers(24, 50, size)
+    salary = rng.integers(50000, 100000, size)
+    experience = rng.integers(2, 23, size)
+    
+    return pd.DataFrame({
+        'Employee_ID': _format_ids('E', np.arange(start + 1, stop + 1), id_width),
+        'Name': pd.Categorical.from_codes(first_idx * len(LAST_NAMES) + last_idx,
+                                          categories=FULL_NAMES),
+        'Department': pd.Categorical.from_codes(dept_idx, categories=DEPARTMENTS),
+        'Age': age,
+        # Make salary correlate somewhat with experience
+        'Salary': salary + experience * 1000,
+        'Experience_Years': experience
+    })
+
+def employee_tasks(n=250, seed=42):
+    """One task per block of the employee dataset"""
+    return _block_tasks(_employee_block, seed, EMPLOYEES, n, BLOCK_SIZE,
+                        id_width=max(3, len(str(n))))
+
+def generate_employees_dataset(n=250, seed=42, chunk_size=BLOCK_SIZE, stream=False,
+                               executor=None, fmt='csv'):
     """Generate employee dataset for Program 1"""
     print("Generating employees dataset...")
+    return _save(employee_tasks(n, seed), 'employees', stream, chunk_size, executor, fmt)
+
+# -----------------------------------------------------------------
+# Sales (Program 2)
+# -----------------------------------------------------------------
+
+def _sales_block(seq, start, stop, with_year=False):
+    """Generate months start..stop-1, one row per product and month"""
+    rng = np.random.default_rng(seq)
+    n_months = stop - start
+    n_products = len(SALES_PRODUCTS)
     
-    departments = ['IT', 'HR', 'Finance', 'Marketing', 'Sales']
-    first_names = ['John', 'Sarah', 'Michael', 'Emily', 'David', 'Jessica', 'Daniel', 
-                   'Lisa', 'James', 'Maria', 'Robert', 'Jennifer', 'Christopher', 
-                   'Amanda', 'Matthew', 'Ashley', 'Joshua', 'Stephanie', 'Andrew', 
-                   'Elizabeth', 'Ryan', 'Michelle', 'Kevin', 'Laura', 'Brian']
-    last_names = ['Smith', 'Johnson', 'Brown', 'Davis', 'Wilson', 'Martinez', 
-                  'Anderson', 'Taylor', 'Thomas', 'Garcia', 'Rodriguez', 'Lee', 
-                  'White', 'Harris', 'Clark', 'Lewis', 'Robinson', 'Walker', 
-                  'Hall', 'Allen', 'Young', 'King', 'Wright', 'Lopez', 'Hill']
-    
-    n_employees = 250
-    
-    data = {
-        'Employee_ID': [f'E{str(i+1).zfill(3)}' for i in range(n_employees)],
-        'Name': [f'{random.choice(first_names)} {random.choice(last_names)}' for _ in range(n_employees)],
-        'Department': [random.choice(departments) for _ in range(n_employees)],
-        'Age': np.random.randint(24, 50, n_employees),
-        'Salary': np.random.randint(50000, 100000, n_employees),
-        'Experience_Years': np.random.randint(2, 23, n_employees)
-    }
+    period = np.repeat(np.arange(start, stop), n_products)
+    month_idx = period % 12
+    base_sales = np.repeat(rng.integers(25000, 50000, n_months), n_products)
+    # Add some seasonal variation
+    seasonal_factor = 1.0 + (month_idx / 12) * 0.5
+    sales = (base_sales * seasonal_factor * rng.uniform(0.8, 1.2, len(period))).astype(np.int64)
+    customers = (sales / (200 + rng.integers(-50, 50, len(period)))).astype(np.int64)
     
-    df = pd.DataFrame(data)
-    # Make salary correlate somewhat with experience
-    df['Salary'] = df['Salary'] + (df['Experience_Years'] * 1000)
-    df.to_csv('employees_data.csv', index=False)
-    print(f"✓ Created employees_data.csv with {len(df)} records\n")
+    df = pd.DataFrame({
+        'Month': pd.Categorical.from_codes(month_idx, dtype=SALES_MONTH),
+        'Product': pd.Categorical.from_codes(np.tile(np.arange(n_products), n_months),
+                                             categories=SALES_PRODUCTS),
+        'Sales': sales,
+        'Profit': (sales * 0.3).astype(np.int64),  # 30% profit margin
+        'Marketing_Spend': (sales * 0.1).astype(np.int64),  # 10% marketing spend
+        'Customer_Count': customers
+    })
+    if with_year:
+        df.insert(0, 'Year', (FIRST_YEAR + period // 12).astype(np.int64))
     return df
 
-def generate_sales_dataset():
+def sales_tasks(n_months=12, seed=42):
+    """One task per block of the sales dataset"""
+    return _block_tasks(_sales_block, seed, SALES, n_months, BLOCK_SIZE // len(SALES_PRODUCTS),
+                        with_year=n_months > 12)
+
+def generate_sales_dataset(n_months=12, seed=42, chunk_size=BLOCK_SIZE, stream=False,
+                           executor=None, fmt='csv'):
     """Generate sales dataset for Program 2"""
     print("Generating sales dataset...")
+    return _save(sales_tasks(n_months, seed), 'sales', stream, chunk_size, executor, fmt)
+
+# -----------------------------------------------------------------
+# Products (Program 3)
+# -----------------------------------------------------------------
+
+def _products_block(seq, start, stop):
+    """Generate products start..stop-1 by cycling through the catalogue"""
+    rng = np.random.default_rng(seq)
+    index = np.arange(start, stop)
+    base = index % len(PRODUCT_CATALOGUE)
+    variant = index // len(PRODUCT_CATALOGUE)
     
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    products = ['Laptop', 'Phone', 'Tablet']
-    
-    data = []
-    for month in months:
-        base_sales = np.random.randint(25000, 50000)
-        for product in products:
-            # Add some seasonal variation
-            seasonal_factor = 1.0 + (months.index(month) / 12) * 0.5
-            sales = int(base_sales * seasonal_factor * np.random.uniform(0.8, 1.2))
-            profit = int(sales * 0.3)  # 30% profit margin
-            marketing = int(sales * 0.1)  # 10% marketing spend
-            customers = int(sales / (200 + np.random.randint(-50, 50)))
-            
-            data.append({
-                'Month': month,
-                'Product': product,
-                'Sales': sales,
-                'Profit': profit,
-                'Marketing_Spend': marketing,
-                'Customer_Count': customers
-            })
-    
-    df = pd.DataFrame(data)
-    df.to_csv('sales_data.csv', index=False)
-    print(f"✓ Created sales_data.csv with {len(df)} records\n")
-    return df
+    names = PRODUCT_CATALOGUE['Product_Name'].to_numpy(dtype=str)[base]
+    if variant[-1] > 0:
+        # Catalogues larger than the base list get numbered variants ("Webcam 2")
+        suffix = np.where(variant > 0, np.char.add(' ', (variant + 1).astype(str)), '')
+        names = np.char.add(names, suffix)
+    
+    # Variants are priced around their base product
+    price = PRODUCT_CATALOGUE['Price'].to_numpy()[base]
+    price_jitter = rng.uniform(0.8, 1.2, len(index))
+    price = np.where(variant > 0, np.rint(price * price_jitter), price).astype(np.int64)
+    
+    return pd.DataFrame({
+        'Product_Name': names,
+        'Price': price,
+        'Category': pd.Categorical(PRODUCT_CATALOGUE['Category'].to_numpy()[base],
+                                   categories=['Electronics', 'Accessories']),
+        # Generate sales count inversely proportional to price (cheaper items sell more)
+        'Sales_Count': (3000 / price * rng.uniform(0.8, 1.2, len(index))).astype(np.int64)
+    })
+
+def products_tasks(n_products=20, seed=42):
+    """One task per block of the products dataset"""
+    return _block_tasks(_products_block, seed, PRODUCTS, n_products, BLOCK_SIZE)
 
-def generate_products_dataset():
+def generate_products_dataset(n_products=20, seed=42, chunk_size=BLOCK_SIZE, stream=False,
+                              executor=None, fmt='csv'):
     """Generate products dataset for Program 3"""
     print("Generating products dataset...")
+    return _save(products_tasks(n_products, seed), 'products', stream, chunk_size,
+                 executor, fmt)
+
+# -----------------------------------------------------------------
+# Monthly performance (Program 4)
+# -----------------------------------------------------------------
+
+def _monthly_performance_block(seq, start, stop, n_months=12, n_stores=1, with_year=False):
+    """Generate rows start..stop-1 with intentional drops every Sep-Oct.
     
-    products_data = {
-        'Product_Name': [
-            'Gaming Laptop', 'Business Laptop', 'Smartphone Pro', 'Smartphone Lite',
-            'Tablet Premium', 'Tablet Basic', 'Wireless Headphones', 'Bluetooth Speaker',
-            'Smart Watch', 'Fitness Tracker', 'Laptop Bag', 'Phone Case',
-            'Screen Protector', 'USB Cable', 'Power Bank', 'Wireless Mouse',
-            'Keyboard', 'Webcam', 'External SSD', 'Monitor'
-        ],
-        'Price': [1299, 899, 799, 399, 599, 299, 199, 149, 
-                  349, 129, 49, 25, 15, 12, 45, 35, 79, 89, 159, 299],
-        'Category': ['Electronics', 'Electronics', 'Electronics', 'Electronics',
-                     'Electronics', 'Electronics', 'Accessories', 'Accessories',
-                     'Electronics', 'Electronics', 'Accessories', 'Accessories',
-                     'Accessories', 'Accessories', 'Accessories', 'Accessories',
-                     'Accessories', 'Accessories', 'Accessories', 'Electronics']
-    }
+    Rows are store-major: row r is month r % n_months of store r // n_months.
+    """
+    rng = np.random.default_rng(seq)
+    row = np.arange(start, stop)
+    store, period = np.divmod(row, n_months)
+    month_idx = period % 12
+    size = len(month_idx)
+    drop = (month_idx == 8) | (month_idx == 9)
+    
+    noise = rng.uniform(-0.05, 0.05, size)
+    satisfaction_noise = rng.uniform(0, 1, size)
+    returns = np.where(drop, 55, 20) + rng.integers(0, np.where(drop, 15, 30))
+    tickets = np.where(drop, 145, 65) + rng.integers(0, np.where(drop, 30, 60))
+    
+    # Create normal growth with drops in Sep-Oct
+    revenue_factor = np.where(drop, 0.85, 1.0 + (month_idx / 12) * 0.3) + noise
+    satisfaction = np.where(drop, 7.5 + satisfaction_noise * 0.3, 8.2 + satisfaction_noise)
     
-    df = pd.DataFrame(products_data)
-    # Generate sales count inversely proportional to price (cheaper items sell more)
-    df['Sales_Count'] = (3000 / df['Price'] * np.random.uniform(0.8, 1.2, len(df))).astype(int)
-    df.to_csv('products_data.csv', index=False)
-    print(f"✓ Created products_data.csv with {len(df)} records\n")
+    # Stores differ in size; the first (or only) store keeps the base revenue
+    base_revenue = 150000 * (1.0 + (store * 37 % 50) / 100)
+    revenue = (base_revenue * revenue_factor).astype(np.int64)
+    
+    df = pd.DataFrame({
+        'Month': pd.Categorical.from_codes(month_idx, dtype=PERFORMANCE_MONTH),
+        'Revenue': revenue,
+        'Customer_Satisfaction': satisfaction.round(1),
+        'Marketing_Budget': (revenue * 0.12).astype(np.int64),
+        'Returns': returns,
+        'Support_Tickets': tickets
+    })
+    if with_year:
+        df.insert(0, 'Year', (FIRST_YEAR + period // 12).astype(np.int64))
+    if n_stores > 1:
+        df.insert(0, 'Store', _format_ids('S', store + 1, max(3, len(str(n_stores)))))
     return df
 
-def generate_monthly_performance_dataset():
+def monthly_performance_tasks(n_months=12, seed=42, n_stores=1):
+    """One task per block of the monthly performance dataset"""
+    return _block_tasks(_monthly_performance_block, seed, MONTHLY_PERFORMANCE,
+                        n_months * n_stores, BLOCK_SIZE, n_months=n_months,
+                        n_stores=n_stores, with_year=n_months > 12)
+
+def generate_monthly_performance_dataset(n_months=12, seed=42, chunk_size=BLOCK_SIZE,
+                                         stream=False, executor=None, fmt='csv', n_stores=1):
     """Generate monthly performance dataset for Program 4"""
     print("Generating monthly performance dataset...")
+    return _save(monthly_performance_tasks(n_months, seed, n_stores), 'monthly_performance',
+                 stream, chunk_size, executor, fmt)
+
+def positive_int(text):
+    """argparse type for options that must be a whole number of at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate the lab datasets")
+    parser.add_argument('--rows', type=positive_int, default=250,
+                        help="number of employee records (default: 250)")
+    parser.add_argument('--sales-months', type=positive_int, default=12,
+                        help="number of months of sales data (default: 12)")
+    parser.add_argument('--products', type=positive_int, default=20,
+                        help="number of products in the catalogue (default: 20)")
+    parser.add_argument('--months', type=positive_int, default=12,
+                        help="number of months of performance data (default: 12)")
+    parser.add_argument('--stores', type=positive_int, default=1,
+                        help="stores in the performance data; more than one adds a "
+                             "Store column with a series per store (default: 1)")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="random seed (default: 42)")
+    parser.add_argument('--chunk-size', type=positive_int, default=BLOCK_SIZE,
+                        help=f"rows per generated chunk (default: {BLOCK_SIZE})")
+    parser.add_argument('--stream', action='store_true',
+                        help="append chunks to the CSV files instead of building "
+                             "each dataset in memory (bounded memory)")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv',
+                        help="output file format; parquet/feather need pyarrow (default: csv)")
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help="worker processes; the output is identical for any "
+                             "number of workers (default: 1)")
+    return parser.parse_args(argv)
+
+def build_datasets(argv=None):
+    """Generate every dataset in memory without writing files.
     
-    months = ['January', 'February', 'March', 'April', 'May', 'June',
-              'July', 'August', 'September', 'October', 'November', 'December']
-    
-    # Create realistic performance data with intentional drops in Sep-Oct
-    base_revenue = 150000
-    data = []
-    
-    for i, month in enumerate(months):
-        # Create normal growth with drops in Sep-Oct
-        if month in ['September', 'October']:
-            revenue_factor = 0.85 + np.random.uniform(-0.05, 0.05)
-            satisfaction = 7.5 + np.random.uniform(0, 0.3)
-            returns = 55 + np.random.randint(0, 15)
-            tickets = 145 + np.random.randint(0, 30)
-        else:
-            revenue_factor = 1.0 + (i / 12) * 0.3 + np.random.uniform(-0.05, 0.05)
-            satisfaction = 8.2 + np.random.uniform(0, 1.0)
-            returns = 20 + np.random.randint(0, 30)
-            tickets = 65 + np.random.randint(0, 60)
-        
-        revenue = int(base_revenue * revenue_factor)
-        marketing = int(revenue * 0.12)
-        
-        data.append({
-            'Month': month,
-            'Revenue': revenue,
-            'Customer_Satisfaction': round(satisfaction, 1),
-            'Marketing_Budget': marketing,
-            'Returns': returns,
-            'Support_Tickets': tickets
-        })
-    
-    df = pd.DataFrame(data)
-    df.to_csv('monthly_performance.csv', index=False)
-    print(f"✓ Created monthly_performance.csv with {len(df)} records\n")
-    return df
+    Takes the same options as the command line and returns {name: DataFrame},
+    typed like load_dataset() would read the files back.
+    """
+    args = parse_args(argv)
+    tasks = {
+        'employees': employee_tasks(args.rows, args.seed),
+        'sales': sales_tasks(args.sales_months, args.seed),
+        'products': products_tasks(args.products, args.seed),
+        'monthly_performance': monthly_performance_tasks(args.months, args.seed, args.stores),
+    }
+    return {name: apply_schema(pd.concat([task() for task in blocks], ignore_index=True), name)
+            for name, blocks in tasks.items()}
 
-def main():
+def main(argv=None):
     """Generate all datasets"""
+    args = parse_args(argv)
     print("=" * 60)
     print("SYNTHETIC DATASET GENERATOR FOR LAB ASSIGNMENT")
     print("=" * 60)
     print()
     
-    generate_employees_dataset()
-    generate_sales_dataset()
-    generate_products_dataset()
-    generate_monthly_performance_dataset()
+    jobs = [
+        (generate_employees_dataset, args.rows),
+        (generate_sales_dataset, args.sales_months),
+        (generate_products_dataset, args.products),
+        (partial(generate_monthly_performance_dataset, n_stores=args.stores), args.months),
+    ]
+    if args.workers > 1:
+        # Blocks of every dataset share one process pool; one writer thread
+        # per dataset keeps the four output files filling concurrently
+        with ProcessPoolExecutor(args.workers) as pool, ThreadPoolExecutor(len(jobs)) as writers:
+            futures = [writers.submit(generate, size, args.seed, args.chunk_size,
+                                      args.stream, pool, args.format)
+                       for generate, size in jobs]
+            for future in futures:
+                future.result()
+    else:
+        for generate, size in jobs:
+            generate(size, args.seed, args.chunk_size, args.stream, fmt=args.format)
     
     print("=" * 60)
     print("✓ All datasets generated successfully!")
     print("=" * 60)
     print("\nGenerated files:")
-    print("  1. employees_data.csv")
-    print("  2. sales_data.csv")
-    print("  3. products_data.csv")
-    print("  4. monthly_performance.csv")
+    for i, name in enumerate(['employees', 'sales', 'products', 'monthly_performance'], 1):
+        print(f"  {i}. {dataset_path(name, args.format)}")
     print()
 
 if __name__ == "__main__":
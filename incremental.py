@@ -0,0 +1,68 @@
+"""
+Incremental Updates for Lab Programs
+Helpers for jobs that keep their state in a file next to an append-only
+CSV and only read the rows added since the previous run
+"""
+
+import hashlib
+import io
+import os
+import numpy as np
+import pandas as pd
+
+# Bytes hashed at the start of the file and just before the saved offset,
+# to notice a CSV that was rewritten instead of appended to
+FINGERPRINT_BYTES = 4096
+
+def state_path(csv_path, kind):
+    """State file kept next to a CSV, e.g. sales_data.model.npz"""
+    return os.path.splitext(csv_path)[0] + f'.{kind}.npz'
+
+def _fingerprint(f, offset):
+    """Hash of the first and last FINGERPRINT_BYTES before offset"""
+    f.seek(0)
+    head = f.read(min(offset, FINGERPRINT_BYTES))
+    start = max(offset - FINGERPRINT_BYTES, 0)
+    f.seek(start)
+    tail = f.read(offset - start)
+    return hashlib.sha1(head + tail).hexdigest()
+
+def read_appended(csv_path, offset=0, fingerprint='', dtype=None):
+    """Read the complete rows added to a CSV since a byte offset.
+    
+    Returns (rows, offset, fingerprint, restarted). restarted is True when
+    everything was read from the top: on the first run, or because the
+    file is shorter than the offset or no longer matches the fingerprint
+    (it was regenerated). The caller must then discard its old state.
+    A partly written last line is left for the next call.
+    """
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        size = os.fstat(f.fileno()).st_size
+        restarted = (offset == 0 or offset > size
+                     or _fingerprint(f, offset) != fingerprint)
+        if restarted:
+            offset = len(header)
+        f.seek(offset)
+        data = f.read()
+        data = data[:data.rfind(b'\n') + 1]
+        offset += len(data)
+        fingerprint = _fingerprint(f, offset)
+    
+    # The header line gives the column names, also when nothing was appended
+    rows = pd.read_csv(io.BytesIO(header + data), dtype=dtype)
+    return rows, offset, fingerprint, restarted
+
+def load_state(path):
+    """Arrays saved by save_state, or None when there is no state yet"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return dict(data)
+
+def save_state(path, **arrays):
+    """Write arrays to an .npz file atomically, so a crash never leaves half a state"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
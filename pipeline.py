@@ -0,0 +1,103 @@
+"""
+In-Process Pipeline for Lab Programs
+Runs the dataset generator and all four programs in one Python process:
+the generated DataFrames are handed straight to the programs instead of
+being written to CSV and parsed back, and every stage is timed
+"""
+
+import argparse
+import importlib
+import time
+import traceback
+
+# (stage name, module, dataset handed to its main)
+PROGRAMS = [
+    ("Program 1: Data Exploration", "program1_data_exploration", "employees"),
+    ("Program 2: Analytics Types", "program2_analytics_types", "sales"),
+    ("Program 3: Visualizations", "program3_visualizations", "products"),
+    ("Program 4: Root Cause Analysis", "program4_root_cause_analysis", "monthly_performance"),
+]
+# Programs that draw figures and take --output-dir
+PLOTTING = ["program3_visualizations", "program4_root_cause_analysis"]
+
+def run_stage(name, func, *args, **kwargs):
+    """Run one stage, printing a banner and its time; returns (result, seconds, ok)"""
+    print(f"\n{'='*70}")
+    print(f"Running: {name}")
+    print(f"{'='*70}\n")
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+        ok = True
+    except (Exception, SystemExit):
+        traceback.print_exc()
+        result, ok = None, False
+    seconds = time.perf_counter() - start
+    print(f"\n{'✅' if ok else '❌'} {name} {'completed' if ok else 'failed'} in {seconds:.2f}s")
+    return result, seconds, ok
+
+def _import_all():
+    """Import the generator and every program once; pandas and NumPy come with them.
+    
+    matplotlib is only imported by the first stage that builds a chart.
+    """
+    modules = [name for _, name, _ in PROGRAMS]
+    return {name: importlib.import_module(name) for name in ['generate_datasets'] + modules}
+
+def run_pipeline(generator_argv=(), output_dir=None):
+    """Generate the datasets in memory and run every program on them.
+    
+    generator_argv takes generate_datasets.py options (e.g. --rows 100000).
+    With output_dir, programs 3 and 4 save their figures there headlessly;
+    otherwise their windows open and have to be closed to continue.
+    Returns {stage: (ok, seconds)}.
+    """
+    results = {}
+    modules, seconds, ok = run_stage("Imports", _import_all)
+    results["Imports"] = (ok, seconds)
+    if not ok:
+        return results
+    
+    datasets, seconds, ok = run_stage("Dataset Generator (in memory)",
+                                      modules['generate_datasets'].build_datasets,
+                                      list(generator_argv))
+    results["Dataset Generator"] = (ok, seconds)
+    if not ok:
+        return results
+    
+    for name, module, dataset in PROGRAMS:
+        argv = ['--output-dir', output_dir] if output_dir and module in PLOTTING else []
+        if module == 'program4_root_cause_analysis' and 'Store' in datasets[dataset].columns:
+            argv += ['--by', 'Store']
+        _, seconds, ok = run_stage(name, modules[module].main, argv, df=datasets[dataset])
+        results[name] = (ok, seconds)
+    return results
+
+def print_timings(results):
+    """Per-stage wall time table"""
+    print("\n" + "=" * 70)
+    print("PIPELINE TIMINGS")
+    print("=" * 70)
+    for name, (ok, seconds) in results.items():
+        print(f"  {name:<40} {seconds:>8.3f}s  {'✅' if ok else '❌'}")
+    print(f"  {'Total':<40} {sum(s for _, s in results.values()):>8.3f}s")
+    print("=" * 70)
+
+def parse_args(argv=None):
+    """Parse command line options; unknown options go to the dataset generator"""
+    parser = argparse.ArgumentParser(
+        description="Run the generator and all lab programs in one process",
+        epilog="Other options, e.g. --rows 100000, are passed to generate_datasets.py.")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="save the figures of programs 3 and 4 to DIR instead of opening windows")
+    return parser.parse_known_args(argv)
+
+def main(argv=None):
+    args, generator_argv = parse_args(argv)
+    results = run_pipeline(generator_argv, args.output_dir)
+    print_timings(results)
+    if not all(ok for ok, _ in results.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Plot Data Preparation for Lab Programs
+Reduces large columns to what a chart actually draws before matplotlib
+sees them: histogram counts drawn as plain bars with vectorized gradient
+colours, and line series decimated to their per-bucket minima and maxima
+"""
+
+import numpy as np
+
+# Line series longer than this are decimated before plotting
+MAX_LINE_POINTS = 2000
+# At most this many category labels are put on a position axis
+MAX_TICK_LABELS = 24
+
+def gradient_colors(edges, cmap):
+    """One colour per bin, from the colormap position of the bin centre"""
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    position = centers - centers.min()
+    span = position.max()
+    return cmap(position / span if span > 0 else position)
+
+def plot_histogram(ax, counts, edges, cmap=None, **bar_kwargs):
+    """Draw precomputed histogram counts as one bar call, like ax.hist would.
+    
+    With cmap the bars get a left-to-right gradient, coloured in a single
+    vectorized colormap lookup instead of one setp call per patch.
+    """
+    if cmap is not None:
+        bar_kwargs['color'] = gradient_colors(edges, cmap)
+    return ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', **bar_kwargs)
+
+def update_histogram(bars, counts, edges):
+    """Move the bars of plot_histogram to new counts and edges, keeping their colours"""
+    for bar, left, width, count in zip(bars, edges[:-1], np.diff(edges), counts):
+        bar.set_bounds(left, 0, width, count)
+
+def decimate(x, y, max_points=MAX_LINE_POINTS):
+    """Keep the minimum and maximum of y per bucket, plus both end points.
+    
+    Preserves every peak and dip of the series, which is what a line chart
+    of more points than pixels shows anyway. Returns the kept (x, y).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n_buckets = (max_points - 2) // 2
+    if len(y) <= max_points or n_buckets < 1:
+        return x, y
+    edges = np.linspace(0, len(y), n_buckets + 1).astype(np.int64)
+    # Pad every bucket to the same width so argmin/argmax run as 2-D ops
+    width = int(np.diff(edges).max())
+    index = np.minimum(edges[:-1, None] + np.arange(width), edges[1:, None] - 1)
+    buckets = y[index]
+    low = index[np.arange(n_buckets), buckets.argmin(axis=1)]
+    high = index[np.arange(n_buckets), buckets.argmax(axis=1)]
+    keep = np.unique(np.concatenate([low, high, [0, len(y) - 1]]))
+    return x[keep], y[keep]
+
+def set_position_labels(ax, labels, max_labels=MAX_TICK_LABELS, rotation=45):
+    """Label x positions 0..n-1 with category names, thinned to max_labels ticks"""
+    step = max(1, -(-len(labels) // max_labels))
+    positions = np.arange(0, len(labels), step)
+    ax.set_xticks(positions)
+    ax.set_xticklabels(np.asarray(labels)[positions], rotation=rotation)
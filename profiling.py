@@ -0,0 +1,223 @@
+"""
+Stage Profiling for Lab Programs
+Named stages ("load", "groupby", "corr", "fit", "render") that record
+their wall time, and optionally cProfile call statistics and tracemalloc
+peaks, while a profiled run is active. Outside a run a stage costs one
+check. A run writes a JSON stage breakdown and folded stacks that flame
+graph tools (flamegraph.pl, speedscope) read directly
+"""
+
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import ContextDecorator, contextmanager
+
+# The Profiler of the current run, if any
+_active = None
+
+class _Frame:
+    """One entered stage on the profiler's stack"""
+    
+    __slots__ = ('path', 'record', 'start', 'base', 'peak')
+    
+    def __init__(self, path, record):
+        self.path = path
+        self.record = record
+        self.start = 0.0
+        self.base = 0
+        self.peak = 0
+
+class Profiler:
+    """Collects the stages of one run; stages nest, e.g. program4;grouped;detect.
+    
+    Every stage path has its own cProfile.Profile, enabled only while that
+    stage is the innermost one, so each function call is counted once. With
+    calls=False only the stage times (and peaks) are kept, without
+    cProfile's overhead.
+    """
+    
+    def __init__(self, name, memory=False, calls=True):
+        self.name = name
+        self.memory = memory
+        self.calls = calls
+        self.stages = {}
+        self._stack = []
+    
+    def __enter__(self):
+        global _active
+        if self.memory:
+            tracemalloc.start()
+        _active = self
+        self._enter(self.name)
+        return self
+    
+    def __exit__(self, *exc):
+        global _active
+        self._exit()
+        _active = None
+        if self.memory:
+            tracemalloc.stop()
+    
+    def _enter(self, name):
+        parent = self._stack[-1] if self._stack else None
+        path = f'{parent.path};{name}' if parent else name
+        record = self.stages.get(path)
+        if record is None:
+            record = self.stages[path] = {'calls': 0, 'seconds': 0.0, 'child_seconds': 0.0,
+                                          'peak_bytes': 0,
+                                          'profile': cProfile.Profile() if self.calls else None}
+        if parent is not None and self.calls:
+            parent.record['profile'].disable()
+        frame = _Frame(path, record)
+        if self.memory:
+            # Stages reset the tracemalloc peak, so outer stages keep theirs first
+            frame.base, peak = tracemalloc.get_traced_memory()
+            for outer in self._stack:
+                outer.peak = max(outer.peak, peak)
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        frame.start = time.perf_counter()
+        if self.calls:
+            record['profile'].enable()
+    
+    def _exit(self):
+        frame = self._stack.pop()
+        record = frame.record
+        if self.calls:
+            record['profile'].disable()
+        seconds = time.perf_counter() - frame.start
+        record['calls'] += 1
+        record['seconds'] += seconds
+        if self.memory:
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            record['peak_bytes'] = max(record['peak_bytes'], peak - frame.base)
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        if self._stack:
+            parent = self._stack[-1].record
+            parent['child_seconds'] += seconds
+            if self.calls:
+                parent['profile'].enable()
+    
+    def report(self):
+        """Machine-readable stage breakdown: inclusive and self time per stage path"""
+        stages = []
+        for path, record in self.stages.items():
+            entry = {
+                'stage': path.rsplit(';', 1)[-1],
+                'path': path,
+                'calls': record['calls'],
+                'seconds': record['seconds'],
+                'self_seconds': record['seconds'] - record['child_seconds'],
+            }
+            if self.memory:
+                entry['peak_memory_mb'] = record['peak_bytes'] / 2 ** 20
+            stages.append(entry)
+        return {'program': self.name, 'total_seconds': self.stages[self.name]['seconds'],
+                'stages': stages}
+    
+    def folded(self):
+        """Folded stack lines ("stage;...;function microseconds") from every stage's cProfile"""
+        lines = []
+        for path, record in self.stages.items():
+            if record['profile'] is not None:
+                lines += _fold(record['profile'], path)
+        return lines
+    
+    def write(self, prefix):
+        """Write PREFIX.profile.json and PREFIX.folded; returns both paths"""
+        json_path, folded_path = f'{prefix}.profile.json', f'{prefix}.folded'
+        with open(json_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        with open(folded_path, 'w') as f:
+            f.writelines(line + '\n' for line in self.folded())
+        return [json_path, folded_path]
+
+def _label(func):
+    """file.py:function name of a cProfile function key"""
+    filename, _, name = func
+    return f'{os.path.basename(filename)}:{name}' if filename != '~' else name.strip('<>')
+
+def _fold(profile, prefix, min_us=1, max_depth=64):
+    """Rebuild approximate call stacks from cProfile's caller statistics.
+    
+    cProfile only keeps caller -> callee totals, so a function's time is
+    split between its callers in proportion to the time each call edge
+    took, the way flameprof and similar converters do.
+    """
+    profile.create_stats()
+    stats = profile.stats
+    children = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, edge_time) in callers.items():
+            children.setdefault(caller, []).append((func, edge_time))
+    roots = [func for func, entry in stats.items()
+             if not any(caller in stats for caller in entry[4])]
+    totals = {}
+    
+    def walk(func, path, labels, share):
+        path = path + (func,)
+        labels = labels + [_label(func)]
+        key = ';'.join(labels)
+        totals[key] = totals.get(key, 0.0) + stats[func][2] * share
+        if len(path) >= max_depth:
+            return
+        for child, edge_time in children.get(func, []):
+            child_total = stats[child][3]
+            child_share = share * edge_time / child_total if child_total > 0 else 0.0
+            # Recursive calls are already inside the outer call's totals
+            if child_share * child_total * 1e6 >= min_us and child not in path:
+                walk(child, path, labels, child_share)
+    
+    for root in roots:
+        walk(root, (), [prefix], 1.0)
+    return [f'{key} {round(seconds * 1e6)}' for key, seconds in totals.items()
+            if round(seconds * 1e6) >= min_us]
+
+class stage(ContextDecorator):
+    """Named stage, as `with stage('fit'):` or `@stage('load')`; free outside a run"""
+    
+    def __init__(self, name):
+        self.name = name
+        self._profilers = []
+    
+    def __enter__(self):
+        # Remember which profiler was entered, so a run that starts inside
+        # the stage does not receive its exit
+        self._profilers.append(_active)
+        if _active is not None:
+            _active._enter(self.name)
+        return self
+    
+    def __exit__(self, *exc):
+        profiler = self._profilers.pop()
+        if profiler is not None:
+            profiler._exit()
+        return False
+
+def add_profile_options(parser, name):
+    """Add --profile [PREFIX] and --profile-memory to a program's argument parser"""
+    parser.add_argument('--profile', nargs='?', const=name, metavar='PREFIX',
+                        help="time the program's stages with cProfile and write "
+                             "PREFIX.profile.json and PREFIX.folded (flame graph stacks); "
+                             f"PREFIX defaults to {name}")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="with --profile, also record each stage's peak memory "
+                             "with tracemalloc (slows the run down)")
+
+@contextmanager
+def profile_run(prefix, memory=False):
+    """Profile the body as one run when prefix is set and write its outputs at the end"""
+    if not prefix:
+        yield None
+        return
+    profiler = Profiler(os.path.basename(prefix), memory)
+    try:
+        with profiler:
+            yield profiler
+    finally:
+        paths = profiler.write(prefix)
+        print(f"✓ Stage profile written to {' and '.join(paths)}", file=sys.stderr)
@@ -3,10 +3,217 @@ Lab Program 1: Basic Data Exploration using Pandas
 Demonstrates: Dataset creation, display, summary statistics, and column listing
 """
 
+import argparse
+import sys
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
+from data_loader import iter_dataset, load_dataset
+from data_schema import apply_schema
+from generate_datasets import positive_int
+from profiling import add_profile_options, profile_run, stage
+from streaming_stats import QuantileSketch, RunningStats, describe_from
 
-def main():
+COLUMNS = ['Employee_ID', 'Name', 'Department', 'Age', 'Salary', 'Experience_Years']
+NUMERIC_COLUMNS = ['Age', 'Salary', 'Experience_Years']
+DEPT_STAT_COLUMNS = ['Avg Salary', 'Min Salary', 'Max Salary', 'Avg Age',
+                     'Avg Experience', 'Employee Count']
+# Larger datasets are shown as a preview unless --full is given
+FULL_TABLE_MAX_ROWS = 1000
+
+def render_preview(head, tail, sample, n_rows):
+    """Render head/tail/sample rows instead of the whole table"""
+    # Render head and tail together so they share column widths
+    edge = pd.concat([head, tail])
+    edge = edge[~edge.index.duplicated()]
+    lines = edge.to_string(index=False).split("\n")
+    if len(edge) == len(head) + len(tail):
+        lines.insert(len(head) + 1, "...")
+    parts = [f"Showing {len(head)} first, {len(tail)} last and {len(sample)} "
+             f"randomly sampled of {n_rows:,} rows",
+             ""] + lines
+    if len(sample):
+        parts += ["", "Random sample:", sample.to_string(index=False)]
+    return "\n".join(parts)
+
+class TableWriter:
+    """Write chunks as one aligned text table without building it as a single string.
+    
+    Column widths are fixed from the first chunk; a later value that is
+    wider than anything seen there only shifts its own row.
+    """
+    
+    def __init__(self, out):
+        self.out = out
+        self.widths = None
+    
+    def write(self, chunk):
+        if chunk.empty:
+            return
+        cells = [chunk[col].astype(str) for col in chunk.columns]
+        if self.widths is None:
+            # Integer columns get one extra leading space, as in to_string()
+            self.widths = [max(len(str(col)), int(cell.str.len().max()))
+                           + pd.api.types.is_integer_dtype(chunk[col])
+                           for col, cell in zip(chunk.columns, cells)]
+            self.out.write(" ".join(str(col).rjust(width)
+                                    for col, width in zip(chunk.columns, self.widths)) + "\n")
+        # Right-justify like DataFrame.to_string(), one column at a time
+        padded = [cell.str.rjust(width) for cell, width in zip(cells, self.widths)]
+        self.out.write("\n".join(padded[0].str.cat(padded[1:], sep=" ")) + "\n")
+
+def _frame_chunks(df, chunksize):
+    """Slice an in-memory DataFrame into row chunks"""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+class RowSampler:
+    """Uniform sample of k rows from a stream of chunks (bottom-k random keys)"""
+    
+    def __init__(self, k, seed=0):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.rows = None
+        self.keys = np.empty(0)
+    
+    def update(self, chunk):
+        keys = np.concatenate([self.keys, self.rng.random(len(chunk))])
+        rows = chunk if self.rows is None else pd.concat([self.rows, chunk])
+        if len(keys) > self.k:
+            keep = np.sort(np.argpartition(keys, self.k)[:self.k])
+            keys, rows = keys[keep], rows.iloc[keep]
+        self.keys, self.rows = keys, rows
+    
+    def sample(self):
+        # Sort by the original row position for display
+        return self.rows.sort_index() if self.rows is not None else pd.DataFrame()
+
+@stage('aggregate')
+def explore_in_memory(df, preview_rows=5, full=False, table_out=None, chunksize=100_000):
+    """Compute every section of the report from a fully loaded DataFrame"""
+    dept_stats = df.groupby('Department', observed=True).agg({
+        'Salary': ['mean', 'min', 'max'],
+        'Age': 'mean',
+        'Experience_Years': 'mean',
+        'Employee_ID': 'count'
+    }).round(2)
+    dept_stats.columns = DEPT_STAT_COLUMNS
+    
+    if table_out is not None:
+        with open(table_out, 'w') as f:
+            writer = TableWriter(f)
+            for chunk in _frame_chunks(df, chunksize):
+                writer.write(chunk)
+    if full or len(df) <= FULL_TABLE_MAX_ROWS:
+        table = None  # printed chunk by chunk by the caller
+    else:
+        sample = df.sample(min(preview_rows, len(df)), random_state=0).sort_index()
+        table = render_preview(df.head(preview_rows), df.tail(preview_rows), sample, len(df))
+    
+    return {
+        'table': table,
+        'summary': df.describe(),
+        'n_rows': len(df),
+        'dtypes': df.dtypes,
+        'dept_stats': dept_stats,
+        'avg_salary': df['Salary'].mean(),
+        'avg_age': df['Age'].mean(),
+        'avg_experience': df['Experience_Years'].mean(),
+        'max_salary': df['Salary'].max(),
+        'min_salary': df['Salary'].min(),
+        'top_department': df['Department'].mode()[0] if len(df) else None,
+    }
+
+@stage('aggregate')
+def explore_streaming(chunks, preview_rows=5, table_out=None):
+    """Compute the same report from chunks, keeping only mergeable accumulators.
+    
+    Memory is bounded by the chunk size; percentiles in the summary come
+    from a QuantileSketch and are exact while a column has few distinct values.
+    The table is shown as a head/tail/sample preview and can be written in
+    full to table_out during the same pass.
+    """
+    totals = RunningStats(NUMERIC_COLUMNS)
+    by_dept = RunningStats(NUMERIC_COLUMNS, by='Department')
+    sketches = {col: QuantileSketch() for col in NUMERIC_COLUMNS}
+    sampler = RowSampler(preview_rows)
+    head = tail = None
+    dtypes = None
+    offset = 0
+    
+    with open(table_out, 'w') if table_out is not None else nullcontext() as table_file:
+        writer = TableWriter(table_file) if table_file is not None else None
+        for chunk in chunks:
+            # Global row numbers, so head/tail/sample keep their file order
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            if head is None:
+                head = chunk.head(preview_rows)
+                dtypes = chunk.dtypes
+            tail = pd.concat([tail, chunk.tail(preview_rows)]).tail(preview_rows)
+            sampler.update(chunk)
+            if writer is not None:
+                writer.write(chunk)
+            totals.update(chunk)
+            by_dept.update(chunk)
+            for col in NUMERIC_COLUMNS:
+                sketches[col].update(chunk[col].to_numpy())
+    
+    if offset == 0:
+        # An empty or header-only file: nothing was accumulated, so report
+        # the empty table the same way the in-memory path does
+        empty = head if head is not None else apply_schema(pd.DataFrame(columns=COLUMNS),
+                                                           'employees')
+        return explore_in_memory(empty, preview_rows)
+    
+    dept_stats = pd.DataFrame({
+        'Avg Salary': by_dept.mean('Salary'),
+        'Min Salary': by_dept.min('Salary'),
+        'Max Salary': by_dept.max('Salary'),
+        'Avg Age': by_dept.mean('Age'),
+        'Avg Experience': by_dept.mean('Experience_Years'),
+        'Employee Count': by_dept.count('Salary'),
+    }).round(2)
+    dept_stats.index.name = 'Department'
+    dept_counts = dept_stats['Employee Count']
+    
+    return {
+        'table': render_preview(head, tail, sampler.sample(), offset),
+        'summary': describe_from(totals, sketches),
+        'n_rows': offset,
+        'dtypes': dtypes,
+        'dept_stats': dept_stats,
+        'avg_salary': totals.total('mean', 'Salary'),
+        'avg_age': totals.total('mean', 'Age'),
+        'avg_experience': totals.total('mean', 'Experience_Years'),
+        'max_salary': totals.total('max', 'Salary'),
+        'min_salary': totals.total('min', 'Salary'),
+        # Like Series.mode(): the alphabetically first of the most common values
+        'top_department': min(dept_counts.index[dept_counts == dept_counts.max()].astype(str)),
+    }
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Lab Program 1: Basic Data Exploration")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the dataset in chunks instead of loading it into memory")
+    parser.add_argument('--chunksize', type=positive_int, default=100_000,
+                        help="rows per chunk in streaming mode (default: 100000)")
+    parser.add_argument('--preview', type=positive_int, default=5, metavar='N',
+                        help="rows shown from the head, tail and a random sample when "
+                             f"the dataset has more than {FULL_TABLE_MAX_ROWS} rows (default: 5)")
+    parser.add_argument('--full', action='store_true',
+                        help="print the complete table even for large datasets")
+    parser.add_argument('--table-out', metavar='PATH',
+                        help="write the complete table to PATH, chunk by chunk")
+    add_profile_options(parser, 'program1_data_exploration')
+    args = parser.parse_args(argv)
+    if args.full and args.stream:
+        parser.error("--full is not available with --stream; use --table-out instead")
+    return args
+
+def run(args, df=None):
+    """Run the program for parsed options; df is an employees table to use instead of loading the file"""
     print("=" * 70)
     print("LAB PROGRAM 1: BASIC DATA EXPLORATION")
     print("=" * 70)
@@ -14,54 +221,59 @@ def main():
     
     # Load the employee dataset
     print("Loading employee dataset...")
-    df = pd.read_csv('employees_data.csv')
+    if args.stream and df is None:
+        results = explore_streaming(iter_dataset('employees', COLUMNS, args.chunksize),
+                                    args.preview, args.table_out)
+    else:
+        df = load_dataset('employees', columns=COLUMNS) if df is None else df[COLUMNS]
+        results = explore_in_memory(df, args.preview, args.full, args.table_out, args.chunksize)
     print("Dataset loaded successfully!\n")
     
     # 1. Display the dataset in tabular format
     print("-" * 70)
     print("1. COMPLETE DATASET (Tabular Format)")
     print("-" * 70)
-    print(df.to_string(index=False))
+    if results['n_rows'] == 0:
+        print("No records in the dataset.")
+    elif results['table'] is None:
+        # Small dataset or --full: render the whole table, one chunk at a time
+        writer = TableWriter(sys.stdout)
+        for chunk in _frame_chunks(df, args.chunksize):
+            writer.write(chunk)
+    else:
+        print(results['table'])
     print()
     
     # 2. Summary statistics
     print("-" * 70)
     print("2. SUMMARY STATISTICS")
     print("-" * 70)
-    print(df.describe())
+    print(results['summary'])
     print()
     
     # Additional descriptive statistics
     print("-" * 70)
     print("3. ADDITIONAL DATASET INFORMATION")
     print("-" * 70)
-    print(f"Total number of records: {len(df)}")
-    print(f"Total number of columns: {len(df.columns)}")
+    print(f"Total number of records: {results['n_rows']}")
+    print(f"Total number of columns: {len(COLUMNS)}")
     print(f"\nData types:")
-    print(df.dtypes)
+    print(results['dtypes'])
     print()
     
     # Department-wise statistics
     print("-" * 70)
     print("4. DEPARTMENT-WISE ANALYSIS")
     print("-" * 70)
-    dept_stats = df.groupby('Department').agg({
-        'Salary': ['mean', 'min', 'max'],
-        'Age': 'mean',
-        'Experience_Years': 'mean',
-        'Employee_ID': 'count'
-    }).round(2)
-    dept_stats.columns = ['Avg Salary', 'Min Salary', 'Max Salary', 'Avg Age', 
-                          'Avg Experience', 'Employee Count']
-    print(dept_stats)
+    print(results['dept_stats'])
     print()
     
     # 3. List all column names
     print("-" * 70)
     print("5. COLUMN NAMES")
     print("-" * 70)
-    print(f"Total Columns: {len(df.columns)}\n")
-    for i, col in enumerate(df.columns, 1):
+    print(f"Total Columns: {len(COLUMNS)}\n")
+    for i, col in enumerate(COLUMNS, 1):
         print(f"{i}. {col}")
     print()
     
@@ -69,17 +281,25 @@ def main():
     print("-" * 70)
     print("6. KEY INSIGHTS")
     print("-" * 70)
-    print(f"• Average Salary: ${df['Salary'].mean():,.2f}")
-    print(f"• Average Age: {df['Age'].mean():.1f} years")
-    print(f"• Average Experience: {df['Experience_Years'].mean():.1f} years")
-    print(f"• Highest Salary: ${df['Salary'].max():,}")
-    print(f"• Lowest Salary: ${df['Salary'].min():,}")
-    print(f"• Most common department: {df['Department'].mode()[0]}")
+    if results['n_rows'] == 0:
+        print("• No records to summarise")
+    else:
+        print(f"• Average Salary: ${results['avg_salary']:,.2f}")
+        print(f"• Average Age: {results['avg_age']:.1f} years")
+        print(f"• Average Experience: {results['avg_experience']:.1f} years")
+        print(f"• Highest Salary: ${results['max_salary']:,}")
+        print(f"• Lowest Salary: ${results['min_salary']:,}")
+        print(f"• Most common department: {results['top_department']}")
     print()
     
     print("=" * 70)
     print("✓ Data Exploration Complete!")
     print("=" * 70)
 
+def main(argv=None, df=None):
+    args = parse_args(argv)
+    with profile_run(args.profile, args.profile_memory):
+        run(args, df)
+
 if __name__ == "__main__":
     main()
@@ -3,27 +3,301 @@ Lab Program 2: Four Types of Data Analytics
 Demonstrates: Descriptive, Diagnostic, Predictive, and Prescriptive Analytics
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
+from data_loader import dataset_path, find_dataset, load_dataset
+from data_schema import MONTHS_FULL, SALES_MONTH, dtypes_for, month_number
+from forecasting import BatchedLinearRegression, panel_arrays
+from incremental import load_state, read_appended, save_state, state_path
+from profiling import add_profile_options, profile_run, stage
+from result_cache import add_cache_options, open_cache
+from streaming_stats import CoMoments
 
-def main():
+# Regression features; Month_Num must stay first (see future_features)
+FEATURES = ['Month_Num', 'Marketing_Spend', 'Customer_Count']
+MODEL_COLUMNS = FEATURES + ['Sales']
+FORECAST_MONTHS = 3
+GROWTH_FACTOR = 1.05  # 5% growth assumption
+CORRELATION_COLUMNS = ['Sales', 'Profit', 'Marketing_Spend', 'Customer_Count']
+# Version of analyze()'s results in the cache; bump it whenever they change
+RESULTS_VERSION = 1
+
+# Totals kept per (Product, Month) cell
+CELL_AGGREGATIONS = {
+    'Sales': ('Sales', 'sum'),
+    'Rows': ('Sales', 'count'),
+    'Profit': ('Profit', 'sum'),
+    'Marketing_Spend': ('Marketing_Spend', 'sum'),
+    'Customer_Count': ('Customer_Count', 'sum'),
+}
+
+@stage('groupby')
+def build_aggregates(df):
+    """Aggregate the sales table once and derive every summary from the result.
+    
+    The only full-table pass is one groupby over (Product, Month); product,
+    month and overall figures are then rolled up from that small table, so
+    the descriptive, diagnostic and prescriptive sections never rescan df.
+    Month is an ordered categorical, so grouping runs on its integer codes
+    and by_month comes out in calendar order (per Year for multi-year data).
+    """
+    periods = ['Year', 'Month'] if 'Year' in df.columns else ['Month']
+    cells = df.groupby(['Product'] + periods, observed=True).agg(**CELL_AGGREGATIONS)
+    return rollup(cells)
+
+def rollup(cells):
+    """Product, month and overall totals from the (Product, [Year,] Month) cells"""
+    periods = [name for name in cells.index.names if name != 'Product']
+    by_product = cells.groupby(level='Product', observed=True).sum()
+    by_month = cells.groupby(level=periods, observed=True).sum()
+    return {
+        'cells': cells,
+        'by_product': by_product,
+        'by_month': by_month,
+        'totals': by_product.sum(),
+    }
+
+def future_features(X, mask, horizon, growth=GROWTH_FACTOR):
+    """Feature rows for the next months of every series.
+    
+    Month_Num continues from each series' last month; marketing spend and
+    customers are estimated as the series average plus the growth factor.
+    """
+    present = np.where(mask[..., None], X, np.nan)
+    last_month = np.nanmax(present[..., 0], axis=1)
+    future = np.empty((len(X), horizon, X.shape[2]))
+    future[..., 0] = last_month[:, None] + np.arange(1, horizon + 1)
+    future[..., 1:] = (np.nanmean(present[..., 1:], axis=1) * growth)[:, None, :]
+    return future
+
+def month_observations(by_month):
+    """Rows of the total sales model (MODEL_COLUMNS), one per month"""
+    periods = by_month.index.to_frame(index=False)
+    data = by_month[MODEL_COLUMNS[1:]].reset_index(drop=True)
+    data.insert(0, 'Month_Num', month_number(periods['Month'], periods.get('Year')))
+    return data
+
+class IncrementalSales:
+    """Sales cells and model statistics kept up to date from rows appended to the CSV.
+    
+    The state file next to sales_data.csv holds the (Product, Year, Month)
+    totals, co-moments of the monthly model rows and of the raw rows, and
+    the byte offset read so far. When new rows touch a month that is
+    already in the model, its old monthly total is removed from the
+    co-moments before the updated total is added back, so the statistics
+    always equal those of a full refit.
+    """
+    
+    KEYS = ['Product', 'Year', 'Month']
+    
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.state_file = state_path(csv_path, 'model')
+        self.reset()
+    
+    def reset(self):
+        self.offset = 0
+        self.fingerprint = ''
+        self.has_year = False
+        self.cells = pd.DataFrame(columns=list(CELL_AGGREGATIONS), dtype='float64',
+                                  index=pd.MultiIndex.from_arrays([[], [], []], names=self.KEYS))
+        self.month_moments = CoMoments(MODEL_COLUMNS)
+        self.row_moments = CoMoments(CORRELATION_COLUMNS)
+    
+    def load(self):
+        """Restore the saved state, if there is one"""
+        state = load_state(self.state_file)
+        if state is None:
+            return self
+        self.offset = int(state['offset'])
+        self.fingerprint = str(state['fingerprint'])
+        self.has_year = bool(state['has_year'])
+        index = pd.MultiIndex.from_arrays([state['product'], state['year'], state['month']],
+                                          names=self.KEYS)
+        self.cells = pd.DataFrame(state['cells'], index=index, columns=list(CELL_AGGREGATIONS))
+        self.month_moments = CoMoments.from_state(
+            MODEL_COLUMNS, state['month_n'], state['month_mean'], state['month_comoment'])
+        self.row_moments = CoMoments.from_state(
+            CORRELATION_COLUMNS, state['row_n'], state['row_mean'], state['row_comoment'])
+        return self
+    
+    def save(self):
+        month, row = self.month_moments.state(), self.row_moments.state()
+        save_state(self.state_file,
+                   offset=self.offset, fingerprint=self.fingerprint, has_year=self.has_year,
+                   product=self.cells.index.get_level_values('Product').to_numpy(dtype=str),
+                   year=self.cells.index.get_level_values('Year').to_numpy(dtype='int64'),
+                   month=self.cells.index.get_level_values('Month').to_numpy(dtype='int64'),
+                   cells=self.cells.to_numpy(dtype='float64'),
+                   **{f'month_{key}': value for key, value in month.items()},
+                   **{f'row_{key}': value for key, value in row.items()})
+    
+    def _month_rows(self, months):
+        """Model rows of the given (Year, Month) keys that have data"""
+        totals = self.cells.groupby(level=['Year', 'Month']).sum()
+        totals = totals[totals.index.isin(months)]
+        year = totals.index.get_level_values('Year').to_numpy()
+        data = totals[MODEL_COLUMNS[1:]].reset_index(drop=True)
+        data.insert(0, 'Month_Num', totals.index.get_level_values('Month').to_numpy() + 12 * year)
+        return data
+    
+    @stage('load')
+    def update(self):
+        """Fold the rows appended since the last run into the state; returns how many"""
+        rows, offset, fingerprint, restarted = read_appended(
+            self.csv_path, self.offset, self.fingerprint, dtypes_for('sales'))
+        if restarted:
+            self.reset()
+        self.offset, self.fingerprint = offset, fingerprint
+        if rows.empty:
+            return 0
+        
+        self.has_year = self.has_year or 'Year' in rows.columns
+        keys = pd.DataFrame({
+            'Product': rows['Product'].astype(str),
+            'Year': rows['Year'].astype('int64') if 'Year' in rows.columns else 0,
+            'Month': rows['Month'].cat.codes.astype('int64'),
+        })
+        new_cells = pd.concat([keys, rows[CORRELATION_COLUMNS]], axis=1).groupby(
+            self.KEYS).agg(**CELL_AGGREGATIONS)
+        touched = new_cells.index.droplevel('Product').unique()
+        
+        # Downdate the months the new rows belong to, then add them back updated
+        self.month_moments.remove(self._month_rows(touched))
+        self.cells = self.cells.add(new_cells, fill_value=0)
+        self.month_moments.add(self._month_rows(touched))
+        self.row_moments.add(rows)
+        return len(rows)
+    
+    def aggregates(self):
+        """Same result as build_aggregates() on the full file"""
+        cells = self.cells.astype('int64').reset_index()
+        cells['Product'] = cells['Product'].astype('category')
+        cells['Year'] = cells['Year'].astype('int16')
+        cells['Month'] = pd.Categorical.from_codes(cells['Month'], dtype=SALES_MONTH)
+        keys = self.KEYS if self.has_year else ['Product', 'Month']
+        return rollup(cells.set_index(keys)[list(CELL_AGGREGATIONS)].sort_index())
+
+def month_label(key):
+    """Display name of a by_month index entry: 'Nov', or 'Nov 2025' with a Year"""
+    return f"{key[1]} {key[0]}" if isinstance(key, tuple) else key
+
+def analyze(sample, aggregates, row_moments, month_moments=None):
+    """Every figure the report prints, from the aggregates and the row co-moments.
+    
+    month_moments are the co-moments of the monthly model rows when they
+    are kept between runs (incremental mode); otherwise they are built from
+    by_month here. The result is small and picklable, so it can be cached.
+    """
+    # Matrix and key pairs all come from the co-moments of one pass
+    with stage('corr'):
+        correlation_matrix = row_moments.correlation()
+    
+    # Prepare data for prediction (aggregate by month), with the month
+    # number for the time series in true chronological order
+    monthly_data = month_observations(aggregates['by_month'])
+    
+    # Train linear regression model from the co-moments of the monthly rows
+    with stage('fit'):
+        if month_moments is None:
+            month_moments = CoMoments(MODEL_COLUMNS).add(monthly_data)
+        model = BatchedLinearRegression().fit_moments([month_moments], 'Sales')
+    
+    # Predict the whole horizon in one call
+    last_month = monthly_data['Month_Num'].iloc[-1]
+    next_months = [f"{MONTHS_FULL[(last_month + i) % 12]} (Next)"
+                   for i in range(1, FORECAST_MONTHS + 1)]
+    X = monthly_data[FEATURES].to_numpy(dtype='float64')[None]
+    mask = np.ones(X.shape[:2], dtype=bool)
+    predicted_sales = model.predict(future_features(X, mask, FORECAST_MONTHS))[0]
+    
+    # Same model for every product, fitted and scored as one batch
+    cells = aggregates['cells'].reset_index()
+    cells['Month_Num'] = month_number(cells['Month'], cells.get('Year'))
+    products, _, values, mask = panel_arrays(cells, ['Product'], cells['Month_Num'],
+                                             FEATURES + ['Sales'])
+    X, y = values[..., :-1], values[..., -1]
+    with stage('fit'):
+        product_model = BatchedLinearRegression().fit(X, y, mask)
+    product_forecast = pd.DataFrame(
+        product_model.predict(future_features(X, mask, FORECAST_MONTHS)).round().astype('int64'),
+        index=products['Product'], columns=next_months)
+    product_forecast.insert(0, 'R²', product_model.score(X, y, mask).round(3))
+    
+    return {
+        'sample': sample,
+        'totals': aggregates['totals'],
+        'by_product': aggregates['by_product'],
+        'by_month': aggregates['by_month'],
+        'correlation': correlation_matrix,
+        'pairs': {column: row_moments.pair('Sales', column)
+                  for column in CORRELATION_COLUMNS[1:]},
+        'r2': model.r2_[0],
+        'forecast': pd.Series(predicted_sales, index=next_months),
+        'product_forecast': product_forecast,
+    }
+
+def cache_key(cache):
+    """Key of the sales file's results under the current model settings"""
+    path, _ = find_dataset('sales')
+    return cache.key(path, program='program2', version=RESULTS_VERSION, features=FEATURES,
+                     correlation_columns=CORRELATION_COLUMNS,
+                     forecast_months=FORECAST_MONTHS, growth_factor=GROWTH_FACTOR)
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Lab Program 2: Four Types of Data Analytics")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only read the rows appended to sales_data.csv since the last "
+                             "run, updating the aggregates and model statistics saved next to it")
+    add_cache_options(parser)
+    add_profile_options(parser, 'program2_analytics_types')
+    args = parser.parse_args(argv)
+    if args.cache and args.incremental:
+        parser.error("--cache cannot be combined with --incremental")
+    return args
+
+def run(args, df=None):
+    """Run the program for parsed options; df is a sales table to use instead of loading the file"""
     print("=" * 70)
     print("LAB PROGRAM 2: FOUR TYPES OF DATA ANALYTICS")
     print("=" * 70)
     print()
     
-    # Load the sales dataset
+    # Load the sales dataset, unless a cached run already analysed this file
     print("Loading sales dataset...")
-    df = pd.read_csv('sales_data.csv')
-    print("Dataset loaded successfully!\n")
+    cache = open_cache(args) if df is None else None
+    key = cache_key(cache) if cache else None
+    results = cache.get(key) if cache else None
+    if results is not None:
+        print("Dataset unchanged: using the cached results\n")
+    elif args.incremental and df is None:
+        csv_path = dataset_path('sales')
+        sales = IncrementalSales(csv_path).load()
+        new_rows = sales.update()
+        sales.save()
+        print(f"Read {new_rows:,} new rows since the last run")
+        sample = pd.read_csv(csv_path, nrows=10, dtype=dtypes_for('sales'))
+        results = analyze(sample, sales.aggregates(), sales.row_moments, sales.month_moments)
+        print("Dataset loaded successfully!\n")
+    else:
+        # Every column is used; Year is only present in multi-year datasets
+        if df is None:
+            df = load_dataset('sales')
+        aggregates = build_aggregates(df)
+        with stage('corr'):
+            row_moments = CoMoments(CORRELATION_COLUMNS).add(df)
+        results = analyze(df.head(10), aggregates, row_moments)
+        if cache:
+            cache.put(key, results)
+        print("Dataset loaded successfully!\n")
     
     # Display sample data
     print("-" * 70)
     print("SAMPLE DATA (First 10 rows)")
     print("-" * 70)
-    print(df.head(10).to_string(index=False))
+    print(results['sample'].to_string(index=False))
     print()
     
     # =================================================================
@@ -33,10 +307,14 @@ def main():
     print("1. DESCRIPTIVE ANALYTICS - What Happened?")
     print("=" * 70)
     
-    total_sales = df['Sales'].sum()
-    avg_sales = df['Sales'].mean()
-    total_profit = df['Profit'].sum()
-    avg_profit = df['Profit'].mean()
+    totals = results['totals']
+    by_product = results['by_product']
+    by_month = results['by_month']
+    
+    total_sales = totals['Sales']
+    avg_sales = total_sales / totals['Rows']
+    total_profit = totals['Profit']
+    avg_profit = total_profit / totals['Rows']
     
     print(f"• Total Sales: ${total_sales:,}")
     print(f"• Average Sales: ${avg_sales:,.2f}")
@@ -46,18 +324,18 @@ def main():
     
     # Product-wise performance
     print("Product-wise Performance:")
-    product_summary = df.groupby('Product').agg({
-        'Sales': ['sum', 'mean'],
-        'Profit': 'sum',
-        'Customer_Count': 'sum'
+    product_summary = pd.DataFrame({
+        'Total Sales': by_product['Sales'],
+        'Avg Sales': by_product['Sales'] / by_product['Rows'],
+        'Total Profit': by_product['Profit'],
+        'Total Customers': by_product['Customer_Count'],
     }).round(2)
-    product_summary.columns = ['Total Sales', 'Avg Sales', 'Total Profit', 'Total Customers']
     print(product_summary)
     print()
     
     # Monthly trends
     print("Monthly Sales Trend:")
-    monthly_summary = df.groupby('Month')['Sales'].sum()
+    monthly_summary = by_month['Sales']
     print(monthly_summary)
     print()
     
@@ -70,15 +348,13 @@ def main():
     
     # Correlation analysis
     print("Correlation Analysis:")
-    correlation_cols = ['Sales', 'Profit', 'Marketing_Spend', 'Customer_Count']
-    correlation_matrix = df[correlation_cols].corr()
-    print(correlation_matrix.round(3))
+    print(results['correlation'].round(3))
     print()
     
     # Key correlations
-    sales_profit_corr = df['Sales'].corr(df['Profit'])
-    sales_marketing_corr = df['Sales'].corr(df['Marketing_Spend'])
-    sales_customers_corr = df['Sales'].corr(df['Customer_Count'])
+    sales_profit_corr = results['pairs']['Profit']
+    sales_marketing_corr = results['pairs']['Marketing_Spend']
+    sales_customers_corr = results['pairs']['Customer_Count']
     
     print("Key Correlation Findings:")
     print(f"• Sales vs Profit correlation: {sales_profit_corr:.3f}")
@@ -96,48 +372,19 @@ def main():
     print("3. PREDICTIVE ANALYTICS - What Will Happen?")
     print("=" * 70)
     
-    # Prepare data for prediction (aggregate by month)
-    monthly_data = df.groupby('Month').agg({
-        'Sales': 'sum',
-        'Marketing_Spend': 'sum',
-        'Customer_Count': 'sum'
-    }).reset_index()
-    
-    # Create month number for time series
-    monthly_data['Month_Num'] = range(1, len(monthly_data) + 1)
-    
-    # Train linear regression model
-    X = monthly_data[['Month_Num', 'Marketing_Spend', 'Customer_Count']]
-    y = monthly_data['Sales']
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
     # Current model performance
-    train_score = model.score(X, y)
+    train_score = results['r2']
     print(f"Model R² Score: {train_score:.3f}")
     print(f"Model Accuracy: {train_score * 100:.1f}%")
     print()
     
-    # Predict next 3 months
-    print("Sales Forecast for Next 3 Months:")
-    next_months = ['January (Next)', 'February (Next)', 'March (Next)']
-    
-    for i, future_month in enumerate(next_months, 1):
-        month_num = len(monthly_data) + i
-        # Estimate future marketing spend and customers based on trend
-        avg_marketing = monthly_data['Marketing_Spend'].mean()
-        avg_customers = monthly_data['Customer_Count'].mean()
-        growth_factor = 1.05  # 5% growth assumption
-        
-        future_marketing = avg_marketing * growth_factor
-        future_customers = avg_customers * growth_factor
-        
-        future_X = np.array([[month_num, future_marketing, future_customers]])
-        predicted_sales = model.predict(future_X)[0]
-        
-        print(f"• {future_month}: ${predicted_sales:,.0f}")
+    print(f"Sales Forecast for Next {FORECAST_MONTHS} Months:")
+    for future_month, sales in results['forecast'].items():
+        print(f"• {future_month}: ${sales:,.0f}")
+    print()
     
+    print("Product-level Forecast:")
+    print(results['product_forecast'])
     print()
     
     # =================================================================
@@ -150,15 +397,15 @@ def main():
     print("Business Recommendations Based on Analysis:\n")
     
     # Recommendation 1: Best performing product
-    best_product = df.groupby('Product')['Profit'].sum().idxmax()
-    best_product_profit = df.groupby('Product')['Profit'].sum().max()
+    best_product = by_product['Profit'].idxmax()
+    best_product_profit = by_product['Profit'].max()
     print(f"1. FOCUS ON TOP PERFORMER")
     print(f"   • {best_product} generates highest profit (${best_product_profit:,})")
     print(f"   • ACTION: Increase inventory and marketing for {best_product}")
     print()
     
     # Recommendation 2: Marketing optimization
-    roi = (df['Sales'].sum() / df['Marketing_Spend'].sum() - 1) * 100
+    roi = (totals['Sales'] / totals['Marketing_Spend'] - 1) * 100
     print(f"2. MARKETING OPTIMIZATION")
     print(f"   • Current Marketing ROI: {roi:.1f}%")
     if roi > 100:
@@ -168,8 +415,8 @@ def main():
     print()
     
     # Recommendation 3: Seasonal strategy
-    best_month = df.groupby('Month')['Sales'].sum().idxmax()
-    worst_month = df.groupby('Month')['Sales'].sum().idxmin()
+    best_month = month_label(by_month['Sales'].idxmax())
+    worst_month = month_label(by_month['Sales'].idxmin())
     print(f"3. SEASONAL STRATEGY")
     print(f"   • Best performing month: {best_month}")
     print(f"   • Weakest month: {worst_month}")
@@ -177,7 +424,7 @@ def main():
     print()
     
     # Recommendation 4: Customer acquisition
-    avg_sale_per_customer = df['Sales'].sum() / df['Customer_Count'].sum()
+    avg_sale_per_customer = totals['Sales'] / totals['Customer_Count']
     print(f"4. CUSTOMER ACQUISITION")
     print(f"   • Average revenue per customer: ${avg_sale_per_customer:.2f}")
     print(f"   • ACTION: Invest in customer acquisition if cost < ${avg_sale_per_customer * 0.3:.2f}")
@@ -195,5 +442,10 @@ def main():
     print("✓ Analytics Complete!")
     print("=" * 70)
 
+def main(argv=None, df=None):
+    args = parse_args(argv)
+    with profile_run(args.profile, args.profile_memory):
+        run(args, df)
+
 if __name__ == "__main__":
     main()
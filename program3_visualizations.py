@@ -3,11 +3,270 @@ Lab Program 3: Data Visualization
 Demonstrates: Bar Chart, Pie Chart, and Histogram for business data
 """
 
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+from data_loader import iter_dataset, load_dataset
+from generate_datasets import positive_int
+from plot_prep import plot_histogram, update_histogram
+from profiling import add_profile_options, profile_run, stage
+from rendering import FIGURE_FORMATS, figure_name, render_updates, save_figure, use_headless
+from streaming_stats import QuantileSketch, RunningStats
+from topk import TopK, streaming_top
 
-def main():
+COLUMNS = ['Product_Name', 'Price', 'Category', 'Sales_Count']
+
+# Bar colours of the top products, highest price first
+BAR_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
+              '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B88B', '#AAB7B8']
+PIE_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8']
+# Products in the price bar chart
+CHART_TOP_N = 10
+HISTOGRAM_BINS = 10
+
+class ProductsFigure:
+    """Bar chart, pie chart and histogram of a products table, built once.
+    
+    The axes, bars, labels and mean/median lines are created up front and
+    styled in bulk; update() only moves them to a new table's data, so the
+    same figure can be re-rendered for many tables (e.g. one per category).
+    """
+    
+    @stage('layout')
+    def __init__(self, top_n=CHART_TOP_N):
+        # Imported here, so text-only runs never load matplotlib
+        import matplotlib.pyplot as plt
+        # Create figure with 3 subplots
+        self.fig = plt.figure(figsize=(15, 5))
+        self.title = self.fig.suptitle('', fontsize=16, fontweight='bold')
+        
+        # =================================================================
+        # 1. BAR CHART - Product Prices Comparison
+        # =================================================================
+        self.ax1 = ax1 = plt.subplot(1, 3, 1)
+        self.bars = ax1.barh(np.arange(top_n), np.zeros(top_n),
+                             color=BAR_COLORS[:top_n])
+        ax1.set_xlabel('Price ($)', fontsize=11, fontweight='bold')
+        ax1.set_ylabel('Product Name', fontsize=11, fontweight='bold')
+        ax1.set_title(f'Top {top_n} Products by Price', fontsize=12, fontweight='bold', pad=15)
+        ax1.grid(axis='x', alpha=0.3, linestyle='--')
+        
+        # Value labels on all bars from one call; update() just rewrites them
+        self.bar_labels = ax1.bar_label(self.bars, padding=4, fontsize=9, fontweight='bold')
+        
+        # =================================================================
+        # 2. PIE CHART - Category Distribution
+        # =================================================================
+        self.ax2 = plt.subplot(1, 3, 2)
+        self.ax2.set_title('Product Category Distribution', fontsize=12, fontweight='bold', pad=15)
+        
+        # =================================================================
+        # 3. HISTOGRAM - Sales Count Frequency Distribution
+        # =================================================================
+        self.ax3 = ax3 = plt.subplot(1, 3, 3)
+        
+        # Equal-width bins always get the same viridis gradient, so the bar
+        # colours are set once here and update() only moves the bars
+        edges = np.arange(HISTOGRAM_BINS + 1, dtype='float64')
+        self.histogram = plot_histogram(ax3, np.zeros(HISTOGRAM_BINS), edges,
+                                        cmap=plt.cm.viridis, edgecolor='black',
+                                        alpha=0.7, linewidth=1.2)
+        ax3.set_xlabel('Sales Count', fontsize=11, fontweight='bold')
+        ax3.set_ylabel('Frequency (Number of Products)', fontsize=11, fontweight='bold')
+        ax3.set_title('Sales Count Distribution', fontsize=12, fontweight='bold', pad=15)
+        ax3.grid(axis='y', alpha=0.3, linestyle='--')
+        
+        # Statistics lines, moved by update()
+        self.mean_line = ax3.axvline(0, color='red', linestyle='--', linewidth=2)
+        self.median_line = ax3.axvline(0, color='orange', linestyle='--', linewidth=2)
+    
+    @stage('render')
+    def update(self, df, title='Business Data Visualizations', top_products=None):
+        """Redraw the charts for a products table; returns the figure.
+        
+        top_products is the table's price ranking when it is already known
+        (e.g. from the summary); otherwise it is selected from df.
+        """
+        self.title.set_text(title)
+        
+        # Select top products by price for better visibility
+        if top_products is None:
+            top_products = TopK(len(self.bars), 'Price').update(df).result()
+        top_products = top_products.head(len(self.bars))
+        prices = top_products['Price'].to_numpy()
+        shown = np.arange(len(self.bars)) < len(prices)
+        widths = np.zeros(len(self.bars))
+        widths[:len(prices)] = prices
+        for bar, label, width, visible, text in zip(
+                self.bars, self.bar_labels, widths, shown,
+                [f'${price}' for price in prices] + [''] * len(self.bars)):
+            bar.set_width(width)
+            bar.set_visible(visible)
+            label.xy = (width, bar.get_y() + bar.get_height() / 2)
+            label.set_text(text)
+        self.ax1.set_yticks(np.arange(len(prices)), top_products['Product_Name'])
+        self.ax1.relim(visible_only=True)
+        self.ax1.autoscale_view()
+        
+        # Calculate percentage distribution by category; the pie is redrawn
+        # in place, with its labels styled in bulk
+        for artist in self.ax2.patches + self.ax2.texts:
+            artist.remove()
+        category_counts = df['Category'].value_counts()
+        category_counts = category_counts[category_counts > 0]
+        wedges, texts, autotexts = self.ax2.pie(category_counts, 
+                                                labels=category_counts.index,
+                                                autopct='%1.1f%%',
+                                                colors=PIE_COLORS[:len(category_counts)],
+                                                explode=[0.05] * len(category_counts),
+                                                shadow=True,
+                                                startangle=90,
+                                                textprops={'fontsize': 11, 'fontweight': 'bold'})
+        for autotext in autotexts:
+            autotext.set(color='white', fontsize=10)
+        
+        # Bin first and move the histogram bars to the new counts
+        counts, bins = np.histogram(df['Sales_Count'], bins=HISTOGRAM_BINS)
+        update_histogram(self.histogram, counts, bins)
+        mean_sales = df['Sales_Count'].mean()
+        median_sales = df['Sales_Count'].median()
+        self.mean_line.set_xdata([mean_sales, mean_sales])
+        self.mean_line.set_label(f'Mean: {mean_sales:.0f}')
+        self.median_line.set_xdata([median_sales, median_sales])
+        self.median_line.set_label(f'Median: {median_sales:.0f}')
+        self.ax3.legend(fontsize=9)
+        self.ax3.relim()
+        self.ax3.autoscale_view()
+        
+        # Adjust layout
+        self.fig.tight_layout()
+        return self.fig
+
+def build_figure(df, title='Business Data Visualizations', top_products=None):
+    """Bar chart, pie chart and histogram of a products table as one figure"""
+    return ProductsFigure().update(df, title, top_products)
+
+def group_title(key):
+    """Figure title for the products of one group, e.g. one category"""
+    return f'Business Data Visualizations - {key}'
+
+def product_rankings(top_n=10):
+    """The product rankings of the report, as TopK accumulators for one pass.
+    
+    The price ranking always keeps at least the CHART_TOP_N products the bar
+    chart shows, so the chart reuses it instead of ranking the table again.
+    """
+    return {
+        'price': TopK(max(top_n, CHART_TOP_N), 'Price'),
+        'sales': TopK(top_n, 'Sales_Count'),
+        'price_by_category': TopK(top_n, 'Price', by='Category'),
+    }
+
+@stage('aggregate')
+def summarize_in_memory(df, top_n=10):
+    """Statistical summary and rankings of a products table held in memory"""
+    return {
+        'n_rows': len(df),
+        'sample': df.head(10),
+        'avg_price': df['Price'].mean(),
+        'median_price': df['Price'].median(),
+        'min_price': df['Price'].min(),
+        'max_price': df['Price'].max(),
+        'category_counts': df['Category'].value_counts(),
+        'avg_sales': df['Sales_Count'].mean(),
+        'median_sales': df['Sales_Count'].median(),
+        'total_sales': df['Sales_Count'].sum(),
+        'rankings': streaming_top([df], product_rankings(top_n)),
+    }
+
+@stage('aggregate')
+def summarize_streaming(chunks, top_n=10):
+    """The same summary from chunks, keeping only accumulators and the top rows.
+    
+    Memory is bounded by the chunk size plus top_n rows per ranking (and
+    category); medians come from a QuantileSketch.
+    """
+    totals = RunningStats(['Price', 'Sales_Count'])
+    by_category = RunningStats(['Price'], by='Category')
+    sketches = {col: QuantileSketch() for col in ['Price', 'Sales_Count']}
+    rankings = product_rankings(top_n)
+    sample = None
+    for chunk in chunks:
+        if sample is None or len(sample) < 10:
+            sample = pd.concat([sample, chunk]).head(10)
+        totals.update(chunk)
+        by_category.update(chunk)
+        for col, sketch in sketches.items():
+            sketch.update(chunk[col].to_numpy())
+        for ranking in rankings.values():
+            ranking.update(chunk)
+    
+    category_counts = by_category.count('Price').sort_values(ascending=False, kind='stable')
+    return {
+        'n_rows': rankings['price'].n_rows,
+        'sample': sample,
+        'avg_price': totals.total('mean', 'Price'),
+        'median_price': sketches['Price'].quantile(0.5)[0],
+        'min_price': totals.total('min', 'Price'),
+        'max_price': totals.total('max', 'Price'),
+        'category_counts': category_counts.rename('count'),
+        'avg_sales': totals.total('mean', 'Sales_Count'),
+        'median_sales': sketches['Sales_Count'].quantile(0.5)[0],
+        'total_sales': int(totals.total('sum', 'Sales_Count')),
+        'rankings': {name: ranking.result() for name, ranking in rankings.items()},
+    }
+
+def print_rankings(rankings, top_n):
+    """Print the top_n products by price, by sales and by price within each category"""
+    print("\n" + "=" * 70)
+    print("PRODUCT RANKINGS")
+    print("=" * 70)
+    print("\nTop Products by Price:")
+    print(rankings['price'].head(top_n).to_string(index=False))
+    print("\nTop Products by Sales Count:")
+    print(rankings['sales'].to_string(index=False))
+    print("\nTop Products by Price per Category:")
+    print(rankings['price_by_category'].to_string(index=False))
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Lab Program 3: Data Visualization")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="save the figure to DIR without opening a window (headless)")
+    parser.add_argument('--formats', nargs='+', choices=FIGURE_FORMATS, default=['png'],
+                        help="file formats written to --output-dir (default: png)")
+    parser.add_argument('--split-by', metavar='COLUMN',
+                        help="also render one figure per value of COLUMN, e.g. Category")
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help="processes rendering the --split-by figures (default: 1)")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the catalogue in chunks and print the summary "
+                             "without charts, for tables that do not fit in memory")
+    parser.add_argument('--chunksize', type=positive_int, default=100_000,
+                        help="rows per chunk in streaming mode (default: 100000)")
+    parser.add_argument('--top', type=positive_int, metavar='N',
+                        help="also print the top N products by price, by sales and per category")
+    parser.add_argument('--no-plots', action='store_true',
+                        help="print the summary only, without building charts "
+                             "(matplotlib is never imported)")
+    add_profile_options(parser, 'program3_visualizations')
+    args = parser.parse_args(argv)
+    if args.no_plots and (args.output_dir or args.split_by):
+        parser.error("--no-plots cannot be combined with --output-dir or --split-by")
+    if args.split_by and not args.output_dir:
+        parser.error("--split-by needs --output-dir")
+    if args.stream and (args.output_dir or args.split_by):
+        parser.error("--stream prints the summary only; charts need the table in memory")
+    # Only COLUMNS are loaded, so only they can split the table
+    if args.split_by and args.split_by not in COLUMNS:
+        parser.error(f"--split-by column not in the dataset: {args.split_by} "
+                     f"(choose from {', '.join(COLUMNS)})")
+    return args
+
+def run(args, df=None):
+    """Run the program for parsed options; df is a products table to use instead of loading the file"""
+    if args.output_dir:
+        use_headless()
     print("=" * 70)
     print("LAB PROGRAM 3: DATA VISUALIZATION")
     print("=" * 70)
@@ -15,118 +274,44 @@ def main():
     
     # Load the products dataset
     print("Loading products dataset...")
-    df = pd.read_csv('products_data.csv')
+    top_n = args.top or 1
+    if args.stream and df is None:
+        summary = summarize_streaming(iter_dataset('products', COLUMNS, args.chunksize), top_n)
+    else:
+        df = load_dataset('products', columns=COLUMNS) if df is None else df[COLUMNS]
+        summary = summarize_in_memory(df, top_n)
     print("Dataset loaded successfully!\n")
     
     # Display sample data
     print("Sample Data:")
-    print(df.head(10).to_string(index=False))
+    print(summary['sample'].to_string(index=False))
     print()
     
-    # Create figure with 3 subplots
-    fig = plt.figure(figsize=(15, 5))
-    fig.suptitle('Business Data Visualizations', fontsize=16, fontweight='bold')
-    
-    # =================================================================
-    # 1. BAR CHART - Product Prices Comparison
-    # =================================================================
-    print("Creating visualizations...")
-    print("1. Bar Chart - Product Prices")
-    
-    ax1 = plt.subplot(1, 3, 1)
-    
-    # Select top 10 products by price for better visibility
-    top_products = df.nlargest(10, 'Price')
-    
-    bars = ax1.barh(top_products['Product_Name'], top_products['Price'], 
-                    color=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
-                           '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B88B', '#AAB7B8'])
-    
-    ax1.set_xlabel('Price ($)', fontsize=11, fontweight='bold')
-    ax1.set_ylabel('Product Name', fontsize=11, fontweight='bold')
-    ax1.set_title('Top 10 Products by Price', fontsize=12, fontweight='bold', pad=15)
-    ax1.grid(axis='x', alpha=0.3, linestyle='--')
-    
-    # Add value labels on bars
-    for i, (bar, price) in enumerate(zip(bars, top_products['Price'])):
-        ax1.text(price + 20, bar.get_y() + bar.get_height()/2, 
-                f'${price}', va='center', fontsize=9, fontweight='bold')
-    
-    plt.tight_layout()
-    
-    # =================================================================
-    # 2. PIE CHART - Category Distribution
-    # =================================================================
-    print("2. Pie Chart - Category Distribution")
-    
-    ax2 = plt.subplot(1, 3, 2)
-    
-    # Calculate percentage distribution by category
-    category_counts = df['Category'].value_counts()
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8']
-    explode = [0.05] * len(category_counts)  # Slightly separate slices
-    
-    wedges, texts, autotexts = ax2.pie(category_counts, 
-                                        labels=category_counts.index,
-                                        autopct='%1.1f%%',
-                                        colors=colors[:len(category_counts)],
-                                        explode=explode,
-                                        shadow=True,
-                                        startangle=90)
-    
-    # Enhance text
-    for text in texts:
-        text.set_fontsize(11)
-        text.set_fontweight('bold')
-    
-    for autotext in autotexts:
-        autotext.set_color('white')
-        autotext.set_fontsize(10)
-        autotext.set_fontweight('bold')
-    
-    ax2.set_title('Product Category Distribution', fontsize=12, fontweight='bold', pad=15)
-    
-    # =================================================================
-    # 3. HISTOGRAM - Sales Count Frequency Distribution
-    # =================================================================
-    print("3. Histogram - Sales Frequency Distribution")
-    
-    ax3 = plt.subplot(1, 3, 3)
-    
-    # Create histogram
-    n, bins, patches = ax3.hist(df['Sales_Count'], bins=10, 
-                                color='#4ECDC4', edgecolor='black', 
-                                alpha=0.7, linewidth=1.2)
-    
-    # Color bars with gradient
-    cm = plt.cm.viridis
-    bin_centers = 0.5 * (bins[:-1] + bins[1:])
-    col = bin_centers - min(bin_centers)
-    col /= max(col)
-    
-    for c, p in zip(col, patches):
-        plt.setp(p, 'facecolor', cm(c))
-    
-    ax3.set_xlabel('Sales Count', fontsize=11, fontweight='bold')
-    ax3.set_ylabel('Frequency (Number of Products)', fontsize=11, fontweight='bold')
-    ax3.set_title('Sales Count Distribution', fontsize=12, fontweight='bold', pad=15)
-    ax3.grid(axis='y', alpha=0.3, linestyle='--')
-    
-    # Add statistics to the plot
-    mean_sales = df['Sales_Count'].mean()
-    median_sales = df['Sales_Count'].median()
-    ax3.axvline(mean_sales, color='red', linestyle='--', linewidth=2, 
-                label=f'Mean: {mean_sales:.0f}')
-    ax3.axvline(median_sales, color='orange', linestyle='--', linewidth=2, 
-                label=f'Median: {median_sales:.0f}')
-    ax3.legend(fontsize=9)
-    
-    # Adjust layout and display
-    plt.tight_layout()
-    
-    print("\n✓ All visualizations created successfully!")
-    print("\nClosing the plot window will continue the program...")
-    plt.show()
+    if df is None:
+        print(f"Streamed {summary['n_rows']:,} products; charts are skipped in streaming mode.")
+    elif args.no_plots:
+        print("Charts skipped (--no-plots).")
+    else:
+        print("Creating visualizations...")
+        print("1. Bar Chart - Product Prices")
+        print("2. Pie Chart - Category Distribution")
+        print("3. Histogram - Sales Frequency Distribution")
+        fig = build_figure(df, top_products=summary['rankings']['price'])
+        
+        print("\n✓ All visualizations created successfully!")
+        if args.output_dir:
+            paths = save_figure(fig, args.output_dir, 'program3_visualizations', args.formats)
+            if args.split_by:
+                # One figure template per worker process, updated for each group
+                items = [((group, group_title(key)), figure_name('program3', key))
+                         for key, group in df.groupby(args.split_by, observed=True)]
+                paths += render_updates(ProductsFigure, items, args.output_dir,
+                                        args.formats, args.workers)
+            print(f"✓ Saved {len(paths)} file(s) to {args.output_dir}")
+        else:
+            import matplotlib.pyplot as plt
+            print("\nClosing the plot window will continue the program...")
+            plt.show()
     
     # =================================================================
     # Statistical Summary
@@ -136,24 +321,34 @@ def main():
     print("=" * 70)
     
     print("\nPrice Statistics:")
-    print(f"  • Average Price: ${df['Price'].mean():.2f}")
-    print(f"  • Median Price: ${df['Price'].median():.2f}")
-    print(f"  • Price Range: ${df['Price'].min()} - ${df['Price'].max()}")
+    print(f"  • Average Price: ${summary['avg_price']:.2f}")
+    print(f"  • Median Price: ${summary['median_price']:.2f}")
+    print(f"  • Price Range: ${summary['min_price']} - ${summary['max_price']}")
     
     print("\nCategory Distribution:")
-    for category, count in category_counts.items():
-        percentage = (count / len(df)) * 100
+    for category, count in summary['category_counts'].items():
+        percentage = (count / summary['n_rows']) * 100
         print(f"  • {category}: {count} products ({percentage:.1f}%)")
     
+    # The best seller is the top row of the sales ranking, from the same pass
+    best_seller = summary['rankings']['sales'].iloc[0]
     print("\nSales Count Statistics:")
-    print(f"  • Average Sales Count: {df['Sales_Count'].mean():.0f} units")
-    print(f"  • Median Sales Count: {df['Sales_Count'].median():.0f} units")
-    print(f"  • Total Units Sold: {df['Sales_Count'].sum():,} units")
-    print(f"  • Best Seller: {df.loc[df['Sales_Count'].idxmax(), 'Product_Name']} ({df['Sales_Count'].max()} units)")
+    print(f"  • Average Sales Count: {summary['avg_sales']:.0f} units")
+    print(f"  • Median Sales Count: {summary['median_sales']:.0f} units")
+    print(f"  • Total Units Sold: {summary['total_sales']:,} units")
+    print(f"  • Best Seller: {best_seller['Product_Name']} ({best_seller['Sales_Count']} units)")
+    
+    if args.top:
+        print_rankings(summary['rankings'], args.top)
     
     print("\n" + "=" * 70)
     print("✓ Visualization Program Complete!")
     print("=" * 70)
 
+def main(argv=None, df=None):
+    args = parse_args(argv)
+    with profile_run(args.profile, args.profile_memory):
+        run(args, df)
+
 if __name__ == "__main__":
     main()
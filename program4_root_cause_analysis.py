@@ -3,26 +3,559 @@ Lab Program 4: Root Cause Analysis
 Demonstrates: Performance drop identification and cause analysis using metrics
 """
 
+import argparse
+from itertools import repeat
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+from data_loader import dataset_columns, dataset_path, find_dataset, load_dataset
+from data_schema import dtypes_for
+from drop_rules import REVENUE_THRESHOLD, SATISFACTION_THRESHOLD
+from generate_datasets import positive_int
+from incremental import load_state, read_appended, save_state, state_path
+from plot_prep import decimate, plot_histogram, set_position_labels
+from profiling import add_profile_options, profile_run, stage
+from result_cache import add_cache_options, open_cache
+from rendering import FIGURE_FORMATS, figure_name, render_many, save_figure, use_headless
+from streaming_stats import CoMoments
 
-def main():
+# Columns of the single-series table and the metrics correlated in its report
+COLUMNS = ['Month', 'Revenue', 'Customer_Satisfaction', 'Marketing_Budget',
+           'Returns', 'Support_Tickets']
+METRICS = COLUMNS[1:]
+# Correlations singled out in the single-series report
+KEY_PAIRS = [('Revenue', 'Customer_Satisfaction'), ('Revenue', 'Returns'),
+             ('Customer_Satisfaction', 'Support_Tickets')]
+# Columns of the flagged-events table after the series keys
+EVENT_COLUMNS = ['Month', 'Revenue', 'Revenue_Change_Pct', 'Customer_Satisfaction',
+                 'Satisfaction_Change', 'High_Returns', 'Returns_Increase', 'High_Tickets',
+                 'Tickets_Increase', 'Marketing_Cut', 'Marketing_Change']
+# Key columns of multi-series data, which the single-series report would run together
+SERIES_KEYS = ['Store']
+# Version of analyze()'s and the grouped results in the cache; bump it whenever they change
+RESULTS_VERSION = 1
+
+def _series(df, by):
+    """The frame itself, or its groups when by names the series key columns"""
+    return df.groupby(by, observed=True, sort=False) if by else df
+
+@stage('detect')
+def detect_drops(df, by=None, revenue_threshold=REVENUE_THRESHOLD,
+                 satisfaction_threshold=SATISFACTION_THRESHOLD):
+    """Add month-over-month change columns and return the positions of drop months.
+    
+    With by (e.g. ['Store']) the changes are taken within each series, so
+    every series' first month has no change. Rows must be in time order
+    within each series.
+    """
+    series = _series(df, by)
+    df['Revenue_Change_Pct'] = series['Revenue'].pct_change() * 100
+    df['Satisfaction_Change'] = series['Customer_Satisfaction'].diff()
+    flagged = ((df['Revenue_Change_Pct'] < revenue_threshold)
+               | (df['Satisfaction_Change'] < satisfaction_threshold))
+    return np.flatnonzero(flagged.to_numpy())
+
+def change_lines(months, changes, unit, up_label):
+    """Report lines like '  May: +1.2% 📈 GROWTH', built for all months at once"""
+    valid = changes.notna().to_numpy()
+    if not valid.any():
+        return []
+    changes = changes[valid]
+    indicators = np.where(changes < 0, "📉 DROP", up_label)
+    values = changes.map(f"{{:+.1f}}{unit}".format)
+    return ("  " + months[valid].astype(str) + ": " + values + " " + indicators).tolist()
+
+@stage('root_causes')
+def root_causes(df, positions, by=None):
+    """Root-cause attribution of the flagged months against the previous month.
+    
+    Every measure is a whole-column operation against the shifted previous
+    values (and means) of the same series; only the rows at positions that
+    have a previous month are kept.
+    """
+    series = _series(df, by)
+    cause_columns = ['Returns', 'Support_Tickets', 'Marketing_Budget']
+    previous = series[cause_columns].shift(1)
+    means = series[cause_columns].transform('mean') if by else df[cause_columns].mean()
+    marketing_change = (df['Marketing_Budget'] / previous['Marketing_Budget'] - 1) * 100
+    causes = pd.DataFrame({
+        'High_Returns': df['Returns'] > means['Returns'],
+        'Returns_Increase': (df['Returns'] / previous['Returns'] - 1) * 100,
+        'High_Tickets': df['Support_Tickets'] > means['Support_Tickets'],
+        'Tickets_Increase': (df['Support_Tickets'] / previous['Support_Tickets'] - 1) * 100,
+        'Marketing_Cut': marketing_change < 0,
+        'Marketing_Change': marketing_change,
+    })
+    positions = positions[previous['Returns'].notna().to_numpy()[positions]]
+    return pd.concat([df.iloc[positions], causes.iloc[positions]], axis=1)
+
+def flagged_events(df, by):
+    """Compact table of every flagged (series, month) and its root-cause checks.
+    
+    The result keeps df's row labels, so tables of disjoint series can be
+    concatenated back into file order.
+    """
+    df = df.copy()
+    events = root_causes(df, detect_drops(df, by), by)
+    keys = by + (['Year'] if 'Year' in df.columns else [])
+    return events[keys + EVENT_COLUMNS]
+
+@stage('grouped')
+def grouped_events(df, by, workers=1):
+    """flagged_events() for every series, optionally spread over worker processes.
+    
+    Series are assigned to workers by their group number, so each series
+    is analysed whole by exactly one process.
+    """
+    if workers <= 1:
+        return flagged_events(df, by)
+    from concurrent.futures import ProcessPoolExecutor
+    part = df.groupby(by, observed=True, sort=False).ngroup().to_numpy() % workers
+    with ProcessPoolExecutor(workers) as pool:
+        tables = list(pool.map(flagged_events, [df[part == i] for i in range(workers)],
+                               repeat(by)))
+    return pd.concat(tables).sort_index()
+
+def analyze(df):
+    """Every figure the single-series report prints and draws, from the table.
+    
+    Adds the change columns to df, which is kept in the result for the
+    charts; the result is small and picklable, so it can be cached.
+    """
+    problem_positions = detect_drops(df)
+    # Matrix and key pairs all come from the co-moments of one pass
+    metric_moments = CoMoments(METRICS).add(df)
+    best = df['Revenue'].idxmax()
+    return {
+        'table': df,
+        'problem_positions': problem_positions,
+        'correlation': metric_moments.correlation(),
+        'pairs': {pair: metric_moments.pair(*pair) for pair in KEY_PAIRS},
+        'causes': root_causes(df, problem_positions),
+        'avg_returns': df['Returns'].mean(),
+        'avg_tickets': df['Support_Tickets'].mean(),
+        'best_month': df.loc[best, 'Month'],
+        'best_budget': df.loc[best, 'Marketing_Budget'],
+    }
+
+def cache_key(cache, by=None):
+    """Key of the performance file's results under the drop thresholds (and series keys)"""
+    path, _ = find_dataset('monthly_performance')
+    return cache.key(path, program='program4', version=RESULTS_VERSION, by=by,
+                     revenue_threshold=REVENUE_THRESHOLD,
+                     satisfaction_threshold=SATISFACTION_THRESHOLD)
+
+def require_columns(columns, by):
+    """Stop with a hint when --by names columns the dataset does not have"""
+    missing = [col for col in by if col not in columns]
+    if missing:
+        raise SystemExit(f"--by column(s) not in the dataset: {', '.join(missing)} "
+                         "(generate per-store data with generate_datasets.py --stores N)")
+
+def _frame_arrays(frame, prefix):
+    """npz arrays of a DataFrame's columns; other than numbers and booleans, values become strings"""
+    arrays = {f'{prefix}_columns': np.array(frame.columns, dtype=str)}
+    for i, col in enumerate(frame.columns):
+        values = frame[col]
+        numeric = pd.api.types.is_numeric_dtype(values.dtype)
+        arrays[f'{prefix}_{i}'] = values.to_numpy() if numeric else values.to_numpy(dtype=str)
+    return arrays
+
+def _frame_from(state, prefix):
+    """DataFrame saved with _frame_arrays"""
+    return pd.DataFrame({col: state[f'{prefix}_{i}']
+                         for i, col in enumerate(state[f'{prefix}_columns'])})
+
+class IncrementalPerformance:
+    """Drop detection kept up to date from rows appended to monthly_performance.csv.
+    
+    The state file next to the CSV holds, per series (a single one without
+    by), the last row, the row count, the Returns and Support_Tickets sums
+    and the best revenue month, plus the co-moments of the metrics, the
+    flagged events so far and the byte offset read. New rows are compared
+    with the row before them in their series, which for the first new row
+    is the saved one, so an update costs O(new rows + series). Events keep
+    their raw returns and tickets and are checked against the current
+    series means when reported, so the results equal a run over the whole
+    file. Changing by or the thresholds starts the state again.
+    """
+    
+    # Key column of the single series when there are no by columns
+    SERIES = '_series'
+    
+    def __init__(self, csv_path, by=None, revenue_threshold=REVENUE_THRESHOLD,
+                 satisfaction_threshold=SATISFACTION_THRESHOLD):
+        self.csv_path = csv_path
+        self.by = list(by or [])
+        self.keys = self.by or [self.SERIES]
+        self.thresholds = [revenue_threshold, satisfaction_threshold]
+        self.state_file = state_path(csv_path, 'drops')
+        self.reset()
+    
+    def reset(self):
+        self.offset = 0
+        self.fingerprint = ''
+        self.series = None
+        self.events = None
+        self.moments = CoMoments(METRICS)
+    
+    def load(self):
+        """Restore the saved state, if there is one for the same by and thresholds"""
+        state = load_state(self.state_file)
+        if (state is None or state['by'].tolist() != self.by
+                or state['thresholds'].tolist() != self.thresholds):
+            return self
+        self.offset = int(state['offset'])
+        self.fingerprint = str(state['fingerprint'])
+        self.series = _frame_from(state, 'series')
+        self.events = _frame_from(state, 'events')
+        self.moments = CoMoments.from_state(METRICS, state['n'], state['mean'], state['comoment'])
+        return self
+    
+    def save(self):
+        if self.series is None:
+            return
+        save_state(self.state_file,
+                   offset=self.offset, fingerprint=self.fingerprint,
+                   by=np.array(self.by, dtype=str), thresholds=np.array(self.thresholds),
+                   **_frame_arrays(self.series, 'series'),
+                   **_frame_arrays(self.events, 'events'),
+                   **self.moments.state())
+    
+    @stage('load')
+    def update(self):
+        """Fold the rows appended since the last run into the state.
+        
+        Returns the new rows with their change columns.
+        """
+        rows, offset, fingerprint, restarted = read_appended(
+            self.csv_path, self.offset, self.fingerprint, dtypes_for('monthly_performance'))
+        if restarted:
+            self.reset()
+        self.offset, self.fingerprint = offset, fingerprint
+        require_columns(rows.columns, self.by)
+        return self._fold(rows)
+    
+    @stage('detect')
+    def _fold(self, rows):
+        rows = rows.assign(**{self.SERIES: ''}) if not self.by else rows
+        rows = rows.astype({col: str for col in self.keys})
+        
+        # Previous row of every new row: within the new rows, else the saved last row
+        previous = rows.groupby(self.keys, sort=False)[METRICS].shift(1)
+        first = ~rows.duplicated(self.keys).to_numpy()
+        if self.series is not None and first.any():
+            saved = rows.loc[first, self.keys].merge(self.series[self.keys + METRICS],
+                                                     how='left', on=self.keys)
+            previous.loc[first, METRICS] = saved[METRICS].to_numpy()
+        changes = pd.DataFrame({
+            'Revenue_Change_Pct': (rows['Revenue'] / previous['Revenue'] - 1) * 100,
+            'Satisfaction_Change': rows['Customer_Satisfaction'] - previous['Customer_Satisfaction'],
+            'Returns_Increase': (rows['Returns'] / previous['Returns'] - 1) * 100,
+            'Tickets_Increase': (rows['Support_Tickets'] / previous['Support_Tickets'] - 1) * 100,
+            'Marketing_Change': (rows['Marketing_Budget'] / previous['Marketing_Budget'] - 1) * 100,
+        })
+        changes['Marketing_Cut'] = changes['Marketing_Change'] < 0
+        flagged = ((changes['Revenue_Change_Pct'] < self.thresholds[0])
+                   | (changes['Satisfaction_Change'] < self.thresholds[1])).to_numpy()
+        rows = pd.concat([rows, changes], axis=1)
+        
+        events = rows[flagged].astype({'Month': str})
+        self.events = (events if self.events is None
+                       else pd.concat([self.events, events], ignore_index=True))
+        if rows.empty:
+            return rows.drop(columns=self.SERIES, errors='ignore')
+        
+        # Every new row folds into its series' last row, counts, sums and best month;
+        # the saved entries come first, so the earliest best month wins ties
+        entries = rows[self.keys + METRICS].assign(
+            Count=1, Returns_Sum=rows['Returns'], Tickets_Sum=rows['Support_Tickets'],
+            Best_Revenue=rows['Revenue'], Best_Month=rows['Month'].astype(str),
+            Best_Budget=rows['Marketing_Budget'])
+        if self.series is not None:
+            entries = pd.concat([self.series, entries], ignore_index=True)
+        groups = entries.groupby(self.keys, sort=False)
+        best = entries.loc[groups['Best_Revenue'].idxmax().to_numpy(),
+                           ['Best_Revenue', 'Best_Month', 'Best_Budget']]
+        totals = groups.agg(**{col: (col, 'last') for col in METRICS},
+                            Count=('Count', 'sum'), Returns_Sum=('Returns_Sum', 'sum'),
+                            Tickets_Sum=('Tickets_Sum', 'sum'))
+        self.series = pd.concat([totals.reset_index(), best.reset_index(drop=True)], axis=1)
+        
+        with stage('corr'):
+            self.moments.add(rows)
+        return rows.drop(columns=self.SERIES, errors='ignore')
+    
+    @property
+    def n_rows(self):
+        return int(self.series['Count'].sum()) if self.series is not None else 0
+    
+    def flagged(self):
+        """Flagged events so far, with their above-average checks against the current means"""
+        if self.events is None:
+            return pd.DataFrame(columns=self.by + EVENT_COLUMNS + METRICS)
+        means = self.series[self.keys].assign(
+            Mean_Returns=self.series['Returns_Sum'] / self.series['Count'],
+            Mean_Tickets=self.series['Tickets_Sum'] / self.series['Count'])
+        events = self.events.merge(means, how='left', on=self.keys)
+        events['High_Returns'] = events['Returns'] > events.pop('Mean_Returns')
+        events['High_Tickets'] = events['Support_Tickets'] > events.pop('Mean_Tickets')
+        return events.drop(columns=self.SERIES, errors='ignore')
+    
+    def results(self, table):
+        """The single-series report's figures (as from analyze) with table as the new rows"""
+        overall = self.series.iloc[0]
+        return {
+            'table': table,
+            'correlation': self.moments.correlation(),
+            'pairs': {pair: self.moments.pair(*pair) for pair in KEY_PAIRS},
+            'causes': self.flagged(),
+            'avg_returns': overall['Returns_Sum'] / overall['Count'],
+            'avg_tickets': overall['Tickets_Sum'] / overall['Count'],
+            'best_month': overall['Best_Month'],
+            'best_budget': overall['Best_Budget'],
+        }
+
+def run_grouped(args, df=None):
+    """Grouped mode: drop detection and root causes for every series at once"""
+    print("Loading monthly performance dataset...")
+    cache = open_cache(args) if df is None else None
+    key = cache_key(cache, args.by) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        events, n_series, n_rows = cached
+        print("Dataset unchanged: using the cached results\n")
+    elif args.incremental and df is None:
+        performance = IncrementalPerformance(dataset_path('monthly_performance'), args.by).load()
+        new_rows = performance.update()
+        performance.save()
+        print(f"Read {len(new_rows):,} new rows since the last run")
+        print("Dataset loaded successfully!\n")
+        flagged = performance.flagged()
+        keys = args.by + (['Year'] if 'Year' in flagged.columns else [])
+        events = flagged[keys + EVENT_COLUMNS]
+        n_series, n_rows = len(performance.series), performance.n_rows
+    else:
+        if df is None:
+            df = load_dataset('monthly_performance')
+        require_columns(df.columns, args.by)
+        print("Dataset loaded successfully!\n")
+        
+        events = grouped_events(df, args.by, args.workers).reset_index(drop=True)
+        n_series, n_rows = df.groupby(args.by, observed=True).ngroups, len(df)
+        if cache:
+            cache.put(key, (events, n_series, n_rows))
+    
+    print("=" * 70)
+    print(f"FLAGGED PERFORMANCE DROPS BY {', '.join(args.by).upper()}")
+    print("=" * 70)
+    print(f"• Series analysed: {n_series:,} ({n_rows:,} rows)")
+    print(f"• Flagged events: {len(events):,} in "
+          f"{events.groupby(args.by, observed=True).ngroups:,} series")
+    print(f"• With high returns: {events['High_Returns'].sum():,}")
+    print(f"• With high support tickets: {events['High_Tickets'].sum():,}")
+    print(f"• With a marketing cut: {events['Marketing_Cut'].sum():,}")
+    print()
+    if len(events):
+        shown = events.head(args.show).round(1)
+        print(f"First {len(shown)} of {len(events):,} events:")
+        print(shown.to_string(index=False))
+        print()
+    if args.events_out:
+        events.to_csv(args.events_out, index=False)
+        print(f"✓ Events written to {args.events_out}")
+    if args.output_dir:
+        # One chart per series, rendered across the worker processes; the
+        # charts need the table itself, also after a cache hit
+        if df is None:
+            df = load_dataset('monthly_performance')
+        jobs = [(build_series_figure, (group, " ".join(map(str, key))),
+                 figure_name('program4', *key))
+                for key, group in df.groupby(args.by, observed=True)]
+        paths = render_many(jobs, args.output_dir, args.formats, args.workers)
+        print(f"✓ Saved {len(paths):,} chart file(s) to {args.output_dir}")
+
+@stage('render')
+def build_figure(df, problem_positions,
+                 title='Root Cause Analysis - Monthly Performance Metrics'):
+    """Trend, returns/tickets and revenue histogram charts of one series"""
+    # Imported here, so text-only runs never load matplotlib
+    import matplotlib.pyplot as plt
+    # Create comprehensive visualization
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    fig.suptitle(title, fontsize=16, fontweight='bold')
+    
+    months_short = df['Month'].str[:3]  # Abbreviated month names
+    # Trend lines are drawn against row positions, decimated for long series
+    positions = np.arange(len(df))
+    
+    # Plot 1: Revenue Trend
+    ax1 = axes[0, 0]
+    x_line, revenue_line = decimate(positions, df['Revenue'].to_numpy())
+    ax1.plot(x_line, revenue_line, marker='o', linewidth=2, 
+             color='#2E86AB', markersize=8)
+    ax1.fill_between(x_line, revenue_line, alpha=0.3, color='#2E86AB')
+    ax1.set_xlabel('Month', fontsize=11, fontweight='bold')
+    ax1.set_ylabel('Revenue ($)', fontsize=11, fontweight='bold')
+    ax1.set_title('Monthly Revenue Trend', fontsize=12, fontweight='bold')
+    ax1.grid(True, alpha=0.3, linestyle='--')
+    set_position_labels(ax1, months_short)
+    
+    # Highlight problem months
+    ax1.scatter(problem_positions, df['Revenue'].iloc[problem_positions],
+                color='red', s=200, zorder=5, marker='X')
+    
+    # Plot 2: Customer Satisfaction
+    ax2 = axes[0, 1]
+    x_line, satisfaction_line = decimate(positions, df['Customer_Satisfaction'].to_numpy())
+    ax2.plot(x_line, satisfaction_line, marker='s', 
+             linewidth=2, color='#A23B72', markersize=8)
+    ax2.fill_between(x_line, satisfaction_line, alpha=0.3, color='#A23B72')
+    ax2.set_xlabel('Month', fontsize=11, fontweight='bold')
+    ax2.set_ylabel('Satisfaction Score', fontsize=11, fontweight='bold')
+    ax2.set_title('Customer Satisfaction Trend', fontsize=12, fontweight='bold')
+    ax2.grid(True, alpha=0.3, linestyle='--')
+    set_position_labels(ax2, months_short)
+    ax2.set_ylim(7, 10)
+    
+    # Highlight problem months
+    ax2.scatter(problem_positions, df['Customer_Satisfaction'].iloc[problem_positions],
+                color='red', s=200, zorder=5, marker='X')
+    
+    # Plot 3: Returns and Support Tickets
+    ax3 = axes[1, 0]
+    x = np.arange(len(months_short))
+    width = 0.35
+    
+    bars1 = ax3.bar(x - width/2, df['Returns'], width, label='Returns', 
+                    color='#F18F01', alpha=0.8)
+    ax3_2 = ax3.twinx()
+    bars2 = ax3_2.bar(x + width/2, df['Support_Tickets'], width, 
+                      label='Support Tickets', color='#C73E1D', alpha=0.8)
+    
+    ax3.set_xlabel('Month', fontsize=11, fontweight='bold')
+    ax3.set_ylabel('Returns', fontsize=11, fontweight='bold', color='#F18F01')
+    ax3_2.set_ylabel('Support Tickets', fontsize=11, fontweight='bold', color='#C73E1D')
+    ax3.set_title('Returns vs Support Tickets', fontsize=12, fontweight='bold')
+    set_position_labels(ax3, months_short)
+    ax3.tick_params(axis='y', labelcolor='#F18F01')
+    ax3_2.tick_params(axis='y', labelcolor='#C73E1D')
+    ax3.legend(loc='upper left')
+    ax3_2.legend(loc='upper right')
+    ax3.grid(True, alpha=0.3, linestyle='--')
+    
+    # Plot 4: Histogram of Revenue Distribution
+    ax4 = axes[1, 1]
+    # Bin first and draw the counts, coloured with a red-to-green gradient
+    counts, bins = np.histogram(df['Revenue'], bins=8)
+    plot_histogram(ax4, counts, bins, cmap=plt.cm.RdYlGn, 
+                   edgecolor='black', alpha=0.7, linewidth=1.2)
+    
+    ax4.set_xlabel('Revenue ($)', fontsize=11, fontweight='bold')
+    ax4.set_ylabel('Frequency (Number of Months)', fontsize=11, fontweight='bold')
+    ax4.set_title('Revenue Distribution (Histogram)', fontsize=12, fontweight='bold')
+    ax4.axvline(df['Revenue'].mean(), color='red', linestyle='--', 
+                linewidth=2, label=f"Mean: ${df['Revenue'].mean():,.0f}")
+    ax4.axvline(df['Revenue'].median(), color='orange', linestyle='--', 
+                linewidth=2, label=f"Median: ${df['Revenue'].median():,.0f}")
+    ax4.legend()
+    ax4.grid(True, alpha=0.3, linestyle='--', axis='y')
+    
+    plt.tight_layout()
+    return fig
+
+def build_series_figure(df, key):
+    """Figure of one series of grouped data, with its own drop months highlighted"""
+    df = df.reset_index(drop=True)
+    positions = detect_drops(df)
+    return build_figure(df, positions, f'Root Cause Analysis - {key}')
+
+def parse_args(argv=None, columns=None):
+    """Parse command line options; columns are the dataset's, read from the file when None"""
+    parser = argparse.ArgumentParser(description="Lab Program 4: Root Cause Analysis")
+    parser.add_argument('--by', nargs='+', metavar='COLUMN',
+                        help="analyse every series of these key columns (e.g. Store) and "
+                             "print a flagged-events table instead of the single-series report")
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help="worker processes for --by, splitting the series (and their "
+                             "charts) between them (default: 1)")
+    parser.add_argument('--show', type=positive_int, default=20, metavar='N',
+                        help="flagged events printed in --by mode (default: 20)")
+    parser.add_argument('--events-out', metavar='PATH',
+                        help="write the complete flagged-events table to a CSV file")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="save charts to DIR without opening a window (headless); "
+                             "with --by, one chart per series")
+    parser.add_argument('--formats', nargs='+', choices=FIGURE_FORMATS, default=['png'],
+                        help="file formats written to --output-dir (default: png)")
+    parser.add_argument('--no-plots', action='store_true',
+                        help="print the report only, without building charts "
+                             "(matplotlib is never imported)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only read the rows appended to monthly_performance.csv since "
+                             "the last run, updating the last rows, running sums, co-moments "
+                             "and flagged events saved next to it")
+    add_cache_options(parser)
+    add_profile_options(parser, 'program4_root_cause_analysis')
+    args = parser.parse_args(argv)
+    if args.cache and args.incremental:
+        parser.error("--cache cannot be combined with --incremental")
+    if args.no_plots and args.output_dir:
+        parser.error("--no-plots cannot be combined with --output-dir")
+    if not args.by:
+        if columns is None:
+            try:
+                columns = dataset_columns('monthly_performance')
+            except FileNotFoundError:
+                columns = []  # reported when the report loads the file
+        series = [col for col in SERIES_KEYS if col in columns]
+        if series:
+            # Changes would run across series, comparing one store's first month
+            # with the previous store's last
+            parser.error(f"the dataset has several series; analyse them with "
+                         f"--by {' '.join(series)}")
+    return args
+
+def run(args, df=None):
+    """Run the program for parsed options; df is a performance table to use instead of loading the file"""
+    if args.output_dir:
+        use_headless()
     print("=" * 70)
     print("LAB PROGRAM 4: ROOT CAUSE ANALYSIS")
     print("=" * 70)
     print()
     
-    # Load the monthly performance dataset
-    print("Loading monthly performance dataset...")
-    df = pd.read_csv('monthly_performance.csv')
-    print("Dataset loaded successfully!\n")
+    if args.by:
+        run_grouped(args, df)
+        return
     
-    # Display the data
+    # Load the monthly performance dataset, unless a cached run already analysed this file
+    print("Loading monthly performance dataset...")
+    incremental = args.incremental and df is None
+    cache = open_cache(args) if df is None else None
+    key = cache_key(cache) if cache else None
+    results = cache.get(key) if cache else None
+    if results is not None:
+        print("Dataset unchanged: using the cached results\n")
+    elif incremental:
+        performance = IncrementalPerformance(dataset_path('monthly_performance')).load()
+        new_rows = performance.update()
+        performance.save()
+        print(f"Read {len(new_rows):,} new rows since the last run")
+        results = performance.results(new_rows)
+        print("Dataset loaded successfully!\n")
+    else:
+        df = load_dataset('monthly_performance', columns=COLUMNS) if df is None else df[COLUMNS]
+        results = analyze(df)
+        if cache:
+            cache.put(key, results)
+        print("Dataset loaded successfully!\n")
+    df = results['table']
+    
+    # Display the data (in incremental mode, the new rows)
     print("-" * 70)
-    print("MONTHLY PERFORMANCE DATA")
+    print("NEW MONTHLY PERFORMANCE DATA" if incremental else "MONTHLY PERFORMANCE DATA")
     print("-" * 70)
-    print(df.to_string(index=False))
+    print(df[COLUMNS].to_string(index=False) if len(df) else "No new rows")
     print()
     
     # =================================================================
@@ -32,33 +565,15 @@ def main():
     print("1. PERFORMANCE DROP IDENTIFICATION")
     print("=" * 70)
     
-    # Calculate month-over-month changes
-    df['Revenue_Change_Pct'] = df['Revenue'].pct_change() * 100
-    df['Satisfaction_Change'] = df['Customer_Satisfaction'].diff()
-    
-    # Identify months with drops
-    revenue_threshold = -5  # 5% drop
-    satisfaction_threshold = -0.3  # 0.3 point drop
+    # Month-over-month changes and the months with drops (so far, in incremental mode)
+    problem_months = results['causes']['Month'].tolist()
     
     print("\nRevenue Changes (Month-over-Month):")
-    for i, row in df.iterrows():
-        if pd.notna(row['Revenue_Change_Pct']):
-            change = row['Revenue_Change_Pct']
-            indicator = "📉 DROP" if change < 0 else "📈 GROWTH"
-            print(f"  {row['Month']}: {change:+.1f}% {indicator}")
+    print("\n".join(change_lines(df['Month'], df['Revenue_Change_Pct'], "%", "📈 GROWTH")))
     
     print("\nCustomer Satisfaction Changes:")
-    for i, row in df.iterrows():
-        if pd.notna(row['Satisfaction_Change']):
-            change = row['Satisfaction_Change']
-            indicator = "📉 DROP" if change < 0 else "📈 IMPROVEMENT"
-            print(f"  {row['Month']}: {change:+.1f} points {indicator}")
-    
-    # Identify problem months
-    problem_months = df[
-        (df['Revenue_Change_Pct'] < revenue_threshold) | 
-        (df['Satisfaction_Change'] < satisfaction_threshold)
-    ]['Month'].tolist()
+    print("\n".join(change_lines(df['Month'], df['Satisfaction_Change'], " points",
+                                 "📈 IMPROVEMENT")))
     
     print(f"\n⚠️  MONTHS WITH SIGNIFICANT PERFORMANCE DROPS:")
     if problem_months:
@@ -78,16 +593,15 @@ def main():
     
     # Analyze correlations
     print("\nCorrelation Analysis:")
-    metrics = ['Revenue', 'Customer_Satisfaction', 'Marketing_Budget', 'Returns', 'Support_Tickets']
-    correlation_matrix = df[metrics].corr()
-    print(correlation_matrix.round(3))
+    print(results['correlation'].round(3))
     print()
     
     # Key findings
     print("Key Correlation Findings:")
-    rev_sat_corr = df['Revenue'].corr(df['Customer_Satisfaction'])
-    rev_returns_corr = df['Revenue'].corr(df['Returns'])
-    sat_tickets_corr = df['Customer_Satisfaction'].corr(df['Support_Tickets'])
+    pairs = results['pairs']
+    rev_sat_corr = pairs['Revenue', 'Customer_Satisfaction']
+    rev_returns_corr = pairs['Revenue', 'Returns']
+    sat_tickets_corr = pairs['Customer_Satisfaction', 'Support_Tickets']
     
     print(f"  • Revenue vs Customer Satisfaction: {rev_sat_corr:.3f}")
     print(f"    → {'Strong positive' if rev_sat_corr > 0.7 else 'Moderate'} relationship")
@@ -102,36 +616,27 @@ def main():
         print("Detailed Analysis of Problem Months:")
         print("-" * 70)
         
-        for month in problem_months:
-            month_data = df[df['Month'] == month].iloc[0]
-            month_idx = df[df['Month'] == month].index[0]
+        for month_data in results['causes'].itertuples(index=False):
+            print(f"\n{month_data.Month}:")
+            print(f"  Revenue: ${month_data.Revenue:,} ({month_data.Revenue_Change_Pct:+.1f}%)")
+            print(f"  Customer Satisfaction: {month_data.Customer_Satisfaction:.1f}/10 ({month_data.Satisfaction_Change:+.1f})")
+            
+            print(f"\n  Possible Root Causes:")
+            
+            # Check returns
+            if month_data.High_Returns:
+                print(f"    ⚠️  High product returns: {month_data.Returns} (+{month_data.Returns_Increase:.1f}% from previous month)")
+                print(f"       → Suggests quality issues or unmet customer expectations")
             
-            if month_idx > 0:
-                prev_data = df.iloc[month_idx - 1]
-                
-                print(f"\n{month}:")
-                print(f"  Revenue: ${month_data['Revenue']:,} ({month_data['Revenue_Change_Pct']:+.1f}%)")
-                print(f"  Customer Satisfaction: {month_data['Customer_Satisfaction']:.1f}/10 ({month_data['Satisfaction_Change']:+.1f})")
-                
-                print(f"\n  Possible Root Causes:")
-                
-                # Check returns
-                if month_data['Returns'] > df['Returns'].mean():
-                    increase = ((month_data['Returns'] / prev_data['Returns']) - 1) * 100
-                    print(f"    ⚠️  High product returns: {month_data['Returns']} (+{increase:.1f}% from previous month)")
-                    print(f"       → Suggests quality issues or unmet customer expectations")
-                
-                # Check support tickets
-                if month_data['Support_Tickets'] > df['Support_Tickets'].mean():
-                    increase = ((month_data['Support_Tickets'] / prev_data['Support_Tickets']) - 1) * 100
-                    print(f"    ⚠️  High support tickets: {month_data['Support_Tickets']} (+{increase:.1f}% from previous month)")
-                    print(f"       → Indicates customer service issues or product problems")
-                
-                # Check marketing
-                marketing_change = ((month_data['Marketing_Budget'] / prev_data['Marketing_Budget']) - 1) * 100
-                if marketing_change < 0:
-                    print(f"    ⚠️  Reduced marketing budget: ${month_data['Marketing_Budget']:,} ({marketing_change:.1f}%)")
-                    print(f"       → Lower marketing spend may have reduced customer acquisition")
+            # Check support tickets
+            if month_data.High_Tickets:
+                print(f"    ⚠️  High support tickets: {month_data.Support_Tickets} (+{month_data.Tickets_Increase:.1f}% from previous month)")
+                print(f"       → Indicates customer service issues or product problems")
+            
+            # Check marketing
+            if month_data.Marketing_Cut:
+                print(f"    ⚠️  Reduced marketing budget: ${month_data.Marketing_Budget:,} ({month_data.Marketing_Change:.1f}%)")
+                print(f"       → Lower marketing spend may have reduced customer acquisition")
     
     print()
     
@@ -144,8 +649,8 @@ def main():
     
     print("\nBased on the analysis, here are the recommended actions:\n")
     
-    avg_returns = df['Returns'].mean()
-    avg_tickets = df['Support_Tickets'].mean()
+    avg_returns = results['avg_returns']
+    avg_tickets = results['avg_tickets']
     
     print("1. QUALITY IMPROVEMENT")
     print(f"   • Average returns: {avg_returns:.0f} units/month")
@@ -160,8 +665,8 @@ def main():
     print()
     
     print("3. MARKETING OPTIMIZATION")
-    best_marketing_month = df.loc[df['Revenue'].idxmax(), 'Month']
-    best_marketing_budget = df.loc[df['Revenue'].idxmax(), 'Marketing_Budget']
+    best_marketing_month = results['best_month']
+    best_marketing_budget = results['best_budget']
     print(f"   • Best performing month: {best_marketing_month} (${best_marketing_budget:,} marketing)")
     print(f"   • ACTION: Maintain consistent marketing investment")
     print(f"   • ACTION: Focus on high-ROI marketing channels")
@@ -179,105 +684,40 @@ def main():
     print("=" * 70)
     print("4. VISUALIZATIONS")
     print("=" * 70)
-    print("\nGenerating visualizations...")
-    
-    # Create comprehensive visualization
-    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    fig.suptitle('Root Cause Analysis - Monthly Performance Metrics', 
-                 fontsize=16, fontweight='bold')
-    
-    months_short = df['Month'].str[:3]  # Abbreviated month names
-    
-    # Plot 1: Revenue Trend
-    ax1 = axes[0, 0]
-    ax1.plot(months_short, df['Revenue'], marker='o', linewidth=2, 
-             color='#2E86AB', markersize=8)
-    ax1.fill_between(range(len(df)), df['Revenue'], alpha=0.3, color='#2E86AB')
-    ax1.set_xlabel('Month', fontsize=11, fontweight='bold')
-    ax1.set_ylabel('Revenue ($)', fontsize=11, fontweight='bold')
-    ax1.set_title('Monthly Revenue Trend', fontsize=12, fontweight='bold')
-    ax1.grid(True, alpha=0.3, linestyle='--')
-    ax1.tick_params(axis='x', rotation=45)
-    
-    # Highlight problem months
-    for month in problem_months:
-        month_idx = df[df['Month'] == month].index[0]
-        ax1.scatter(month_idx, df.loc[month_idx, 'Revenue'], 
-                   color='red', s=200, zorder=5, marker='X')
-    
-    # Plot 2: Customer Satisfaction
-    ax2 = axes[0, 1]
-    ax2.plot(months_short, df['Customer_Satisfaction'], marker='s', 
-             linewidth=2, color='#A23B72', markersize=8)
-    ax2.fill_between(range(len(df)), df['Customer_Satisfaction'], alpha=0.3, color='#A23B72')
-    ax2.set_xlabel('Month', fontsize=11, fontweight='bold')
-    ax2.set_ylabel('Satisfaction Score', fontsize=11, fontweight='bold')
-    ax2.set_title('Customer Satisfaction Trend', fontsize=12, fontweight='bold')
-    ax2.grid(True, alpha=0.3, linestyle='--')
-    ax2.tick_params(axis='x', rotation=45)
-    ax2.set_ylim(7, 10)
-    
-    # Highlight problem months
-    for month in problem_months:
-        month_idx = df[df['Month'] == month].index[0]
-        ax2.scatter(month_idx, df.loc[month_idx, 'Customer_Satisfaction'], 
-                   color='red', s=200, zorder=5, marker='X')
-    
-    # Plot 3: Returns and Support Tickets
-    ax3 = axes[1, 0]
-    x = np.arange(len(months_short))
-    width = 0.35
-    
-    bars1 = ax3.bar(x - width/2, df['Returns'], width, label='Returns', 
-                    color='#F18F01', alpha=0.8)
-    ax3_2 = ax3.twinx()
-    bars2 = ax3_2.bar(x + width/2, df['Support_Tickets'], width, 
-                      label='Support Tickets', color='#C73E1D', alpha=0.8)
-    
-    ax3.set_xlabel('Month', fontsize=11, fontweight='bold')
-    ax3.set_ylabel('Returns', fontsize=11, fontweight='bold', color='#F18F01')
-    ax3_2.set_ylabel('Support Tickets', fontsize=11, fontweight='bold', color='#C73E1D')
-    ax3.set_title('Returns vs Support Tickets', fontsize=12, fontweight='bold')
-    ax3.set_xticks(x)
-    ax3.set_xticklabels(months_short, rotation=45)
-    ax3.tick_params(axis='y', labelcolor='#F18F01')
-    ax3_2.tick_params(axis='y', labelcolor='#C73E1D')
-    ax3.legend(loc='upper left')
-    ax3_2.legend(loc='upper right')
-    ax3.grid(True, alpha=0.3, linestyle='--')
-    
-    # Plot 4: Histogram of Revenue Distribution
-    ax4 = axes[1, 1]
-    n, bins, patches = ax4.hist(df['Revenue'], bins=8, color='#06A77D', 
-                                edgecolor='black', alpha=0.7, linewidth=1.2)
-    
-    # Color gradient
-    cm = plt.cm.RdYlGn
-    bin_centers = 0.5 * (bins[:-1] + bins[1:])
-    col = bin_centers - min(bin_centers)
-    col /= max(col)
-    
-    for c, p in zip(col, patches):
-        plt.setp(p, 'facecolor', cm(c))
-    
-    ax4.set_xlabel('Revenue ($)', fontsize=11, fontweight='bold')
-    ax4.set_ylabel('Frequency (Number of Months)', fontsize=11, fontweight='bold')
-    ax4.set_title('Revenue Distribution (Histogram)', fontsize=12, fontweight='bold')
-    ax4.axvline(df['Revenue'].mean(), color='red', linestyle='--', 
-                linewidth=2, label=f"Mean: ${df['Revenue'].mean():,.0f}")
-    ax4.axvline(df['Revenue'].median(), color='orange', linestyle='--', 
-                linewidth=2, label=f"Median: ${df['Revenue'].median():,.0f}")
-    ax4.legend()
-    ax4.grid(True, alpha=0.3, linestyle='--', axis='y')
-    
-    plt.tight_layout()
-    print("✓ Visualizations created successfully!")
-    print("\nClosing the plot window will complete the program...")
-    plt.show()
+    if args.no_plots:
+        print("\nCharts skipped (--no-plots)")
+    elif incremental and not args.output_dir:
+        # The charts cover the whole history, which incremental runs do not read
+        print("\nCharts skipped in incremental mode; add --output-dir DIR to draw them")
+    else:
+        draw_charts(args, results, incremental)
     
     print("\n" + "=" * 70)
     print("✓ Root Cause Analysis Complete!")
     print("=" * 70)
 
+def draw_charts(args, results, incremental):
+    """Build the single-series figure, then save it or show its window"""
+    print("\nGenerating visualizations...")
+    if incremental:
+        df = load_dataset('monthly_performance', columns=COLUMNS)
+        problem_positions = detect_drops(df)
+    else:
+        df, problem_positions = results['table'], results['problem_positions']
+    fig = build_figure(df, problem_positions)
+    print("✓ Visualizations created successfully!")
+    if args.output_dir:
+        paths = save_figure(fig, args.output_dir, 'program4_root_cause_analysis', args.formats)
+        print(f"✓ Saved {', '.join(paths)}")
+    else:
+        import matplotlib.pyplot as plt
+        print("\nClosing the plot window will complete the program...")
+        plt.show()
+
+def main(argv=None, df=None):
+    args = parse_args(argv, None if df is None else df.columns)
+    with profile_run(args.profile, args.profile_memory):
+        run(args, df)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+"""
+Figure Rendering for Lab Programs
+Headless (Agg) output of figures to PNG/SVG files for cron jobs and
+servers, and rendering of many figures (e.g. one per store) in a
+process pool, either built one by one or by updating a figure template
+"""
+
+import os
+import re
+from itertools import repeat
+from profiling import stage
+
+# matplotlib.pyplot and the process pool are imported inside the functions
+# that use them, so runs that only print text never load either
+
+FIGURE_FORMATS = ['png', 'svg', 'pdf']
+
+def use_headless():
+    """Switch pyplot to the Agg backend: no windows, no display needed"""
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+def figure_name(*parts):
+    """File-system safe figure name, e.g. figure_name('program4', 'S0001')"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', '_'.join(str(part) for part in parts))
+
+@stage('save')
+def save_figure(fig, out_dir, name, formats=('png',), dpi=100, close=True):
+    """Write a figure in every format to out_dir, close it, and return the paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f'{name}.{fmt}')
+        fig.savefig(path, dpi=dpi)
+        paths.append(path)
+    if close:
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+    return paths
+
+def _render(job, out_dir, formats):
+    """Build and save one (build, args, name) job, in whichever process runs it"""
+    build, args, name = job
+    use_headless()
+    return save_figure(build(*args), out_dir, name, formats)
+
+def render_many(jobs, out_dir, formats=('png',), workers=1):
+    """Render (build, args, name) jobs to files and return all written paths.
+    
+    build(*args) must return a Figure. With workers > 1 the jobs are spread
+    over a process pool in batches, so build has to be a module-level
+    function that worker processes can import.
+    """
+    if workers <= 1:
+        results = [_render(job, out_dir, formats) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_render, jobs, [out_dir] * len(jobs),
+                                    [formats] * len(jobs), chunksize=chunksize))
+    return [path for paths in results for path in paths]
+
+def _render_updates(batch, make_template, out_dir, formats):
+    """Build one template and save it once per (args, name) item of a batch"""
+    import matplotlib.pyplot as plt
+    use_headless()
+    template = make_template()
+    paths = []
+    for args, name in batch:
+        template.update(*args)
+        paths += save_figure(template.fig, out_dir, name, formats, close=False)
+    plt.close(template.fig)
+    return paths
+
+def render_updates(make_template, items, out_dir, formats=('png',), workers=1):
+    """Render (args, name) items by updating a figure template instead of rebuilding it.
+    
+    make_template() returns an object with a fig attribute and an
+    update(*args) method that redraws its artists with new data. Every
+    process builds the template once and renders its share of the items.
+    """
+    if workers <= 1 or len(items) <= 1:
+        return _render_updates(items, make_template, out_dir, formats)
+    from concurrent.futures import ProcessPoolExecutor
+    batches = [items[i::workers] for i in range(min(workers, len(items)))]
+    with ProcessPoolExecutor(len(batches)) as pool:
+        results = list(pool.map(_render_updates, batches, repeat(make_template),
+                                repeat(out_dir), repeat(formats)))
+    return [path for paths in results for path in paths]
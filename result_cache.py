@@ -0,0 +1,141 @@
+"""
+Result Cache for Lab Programs
+Content-addressed store for computed results: an entry's key is the hash
+of the input file's bytes plus the parameters that shaped the result, so
+re-running a program on an unchanged dataset with the same settings is
+answered from disk without loading or recomputing anything. Entries are
+compressed pickles; the least recently used ones are evicted when the
+cache grows past its size limit
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import zlib
+from profiling import stage
+
+DEFAULT_CACHE_DIR = '.result_cache'
+DEFAULT_MAX_MB = 256
+# File hashes remembered by (path, size, mtime), so unchanged inputs are not re-read
+DIGESTS_FILE = 'digests.json'
+ENTRY_SUFFIX = '.pkl.z'
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_atomic(path, data):
+    """Write bytes through a temporary file, so readers never see half an entry"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class ResultCache:
+    """Directory of results keyed by input content and parameters.
+    
+    A file's hash is reused while its size and modification time are
+    unchanged, so a hit costs a stat, a small JSON read and unpickling the
+    entry. Reading an entry marks it as recently used; after every write
+    the oldest entries are removed until the cache fits in max_bytes.
+    """
+    
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+    
+    def _digest(self, path):
+        """Content hash of an input file, from the memo when the file is unchanged"""
+        memo_path = os.path.join(self.directory, DIGESTS_FILE)
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+        info = os.stat(path)
+        name = os.path.abspath(path)
+        signature = [info.st_size, info.st_mtime_ns]
+        entry = memo.get(name)
+        if entry and entry['stat'] == signature:
+            return entry['sha256']
+        digest = file_digest(path)
+        memo[name] = {'stat': signature, 'sha256': digest}
+        _write_atomic(memo_path, json.dumps(memo).encode())
+        return digest
+    
+    def key(self, path, **params):
+        """Cache key of the results computed from path with the given parameters.
+        
+        Programs include a version of their results among the parameters, so
+        entries written by older code are never mistaken for current ones.
+        """
+        content = self._digest(path)
+        settings = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(f'{content}\n{settings}'.encode()).hexdigest()
+    
+    def _entry(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+    
+    @stage('cache')
+    def get(self, key):
+        """The stored results for key, or None on a miss (or an unreadable entry)"""
+        path = self._entry(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupt, or pickled by other pandas/numpy versions: drop it and recompute
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+        os.utime(path)
+        return value
+    
+    @stage('cache')
+    def put(self, key, value):
+        """Store results under key, then evict the least recently used entries"""
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        _write_atomic(self._entry(key), data)
+        self.evict(keep=key)
+    
+    def evict(self, keep=None):
+        """Remove entries, oldest use first, until the total fits in max_bytes"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if item.name.endswith(ENTRY_SUFFIX):
+                    info = item.stat()
+                    entries.append((info.st_mtime_ns, info.st_size, item.path))
+        total = sum(size for _, size, _ in entries)
+        kept = self._entry(keep) if keep else None
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path != kept:
+                os.remove(path)
+                total -= size
+
+def add_cache_options(parser):
+    """Add --cache [DIR] and --cache-size MB to a program's argument parser"""
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_DIR, metavar='DIR',
+                        help="reuse the results of an earlier run on the same unchanged "
+                             "dataset and settings, stored in DIR "
+                             f"(default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_MB, metavar='MB',
+                        help="size limit of the cache; least recently used results are "
+                             f"evicted beyond it (default: {DEFAULT_MAX_MB})")
+
+def open_cache(args):
+    """The ResultCache asked for on the command line, or None"""
+    if not args.cache:
+        return None
+    return ResultCache(args.cache, int(args.cache_size * 2 ** 20))
@@ -3,6 +3,7 @@ Quick Test Runner for All Lab Programs
 Runs all programs in sequence (visualization programs require closing windows to continue)
 """
 
+import argparse
 import subprocess
 import sys
 
@@ -37,21 +38,42 @@ def run_program(name, filename):
         print(f"\n❌ Error running {name}: {str(e)}")
         return False
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Run all lab programs in sequence")
+    parser.add_argument('--in-process', action='store_true',
+                        help="run everything in this process via pipeline.py: one "
+                             "interpreter start-up, datasets passed in memory, per-stage timings")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="with --in-process, save the figures to DIR instead of opening windows")
+    args = parser.parse_args(argv)
+    if args.output_dir and not args.in_process:
+        parser.error("--output-dir needs --in-process")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
     print("="*70)
     print("LAB ASSIGNMENT 4 - TEST RUNNER")
     print("="*70)
     print("\nThis script will run all lab programs in sequence.")
-    print("For visualization programs (3 & 4), close the plot windows to continue.")
-    print()
-    
-    input("Press ENTER to start...")
+    if not args.output_dir:
+        print("For visualization programs (3 & 4), close the plot windows to continue.")
+        print()
+        input("Press ENTER to start...")
     
     results = {}
     
-    for name, filename in programs:
-        success = run_program(name, filename)
-        results[name] = "✅ PASSED" if success else "❌ FAILED"
+    if args.in_process:
+        from pipeline import print_timings, run_pipeline
+        timings = run_pipeline(output_dir=args.output_dir)
+        for name, (ok, _) in timings.items():
+            results[name] = "✅ PASSED" if ok else "❌ FAILED"
+        print_timings(timings)
+    else:
+        for name, filename in programs:
+            success = run_program(name, filename)
+            results[name] = "✅ PASSED" if success else "❌ FAILED"
     
     # Print summary
     print("\n" + "="*70)
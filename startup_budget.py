@@ -0,0 +1,160 @@
+"""
+Startup Budget for Lab Programs
+Times how long each program takes to start (imports and option parsing,
+measured as `python PROGRAM --help`) and breaks the import time down by
+package from `python -X importtime`, failing when a program is over its
+budget or loads a plotting library before it draws anything, either at
+startup or during a real text-only run on the default datasets
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROGRAMS = ['program1_data_exploration', 'program2_analytics_types',
+            'program3_visualizations', 'program4_root_cause_analysis']
+# Seconds a text-only run may spend starting up
+DEFAULT_BUDGET = 0.75
+# Packages that must only be imported once a chart is built
+PLOTTING_PACKAGES = ['matplotlib']
+# Options of a full run that prints its report without drawing any chart
+TEXT_RUNS = {
+    'program3_visualizations': ['--no-plots'],
+    'program4_root_cause_analysis': ['--no-plots'],
+}
+
+def parse_importtime(stderr):
+    """(module, self seconds, cumulative seconds) of every `-X importtime` line"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        entries.append((module.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return entries
+
+def by_package(entries):
+    """Import seconds per top-level package (the self times of all its modules)"""
+    totals = {}
+    for module, self_seconds, _ in entries:
+        package = module.split('.')[0]
+        totals[package] = totals.get(package, 0.0) + self_seconds
+    return totals
+
+def _script(name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{name}.py')
+
+def _fastest(command, repeat, cwd=None):
+    """Fastest wall time of repeat runs of a command, output discarded"""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, cwd=cwd, stdout=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+def _imported(command, cwd=None):
+    """Import seconds per package of one run of a command under `-X importtime`"""
+    traced = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], check=True,
+                            cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True)
+    return by_package(parse_importtime(traced.stderr))
+
+def measure(program, repeat=3, data_dir=None):
+    """Fastest `--help` wall time of a program and the import breakdown of one run.
+    
+    With data_dir, programs that have a text-only mode also run it on the
+    datasets there, recording its fastest time and any plotting packages
+    it imported.
+    """
+    command = [sys.executable, _script(program), '--help']
+    packages = _imported(command)
+    record = {
+        'program': program,
+        'seconds': _fastest(command, repeat),
+        'import_seconds': sum(packages.values()),
+        'packages': dict(sorted(packages.items(), key=lambda item: -item[1])),
+        'plotting': [name for name in PLOTTING_PACKAGES if name in packages],
+    }
+    if data_dir and program in TEXT_RUNS:
+        command = [sys.executable, _script(program)] + TEXT_RUNS[program]
+        packages = _imported(command, data_dir)
+        record['text_run'] = {
+            'options': TEXT_RUNS[program],
+            'seconds': _fastest(command, repeat, data_dir),
+            'plotting': [name for name in PLOTTING_PACKAGES if name in packages],
+        }
+    return record
+
+def generate_default_data(directory):
+    """Write the generator's default datasets to directory"""
+    subprocess.run([sys.executable, _script('generate_datasets')], check=True, cwd=directory,
+                   stdout=subprocess.DEVNULL)
+
+def report(results, budget, top=5):
+    """Print each program's startup against the budget; returns the failing programs"""
+    failures = []
+    print(f"{'program':<30} {'startup':>8} {'imports':>8} {'text run':>9}  heaviest packages")
+    for record in results:
+        heaviest = ', '.join(f"{name} {seconds:.3f}s"
+                             for name, seconds in list(record['packages'].items())[:top])
+        problems = []
+        if record['seconds'] > budget:
+            problems.append(f"over the {budget:.2f}s budget")
+        if record['plotting']:
+            problems.append(f"imports {', '.join(record['plotting'])} at startup")
+        text_run = record.get('text_run')
+        if text_run and text_run['plotting']:
+            problems.append(f"imports {', '.join(text_run['plotting'])} with "
+                            f"{' '.join(text_run['options'])}")
+        if problems:
+            failures.append(record['program'])
+        run_seconds = f"{text_run['seconds']:>8.3f}s" if text_run else f"{'-':>9}"
+        print(f"{record['program']:<30} {record['seconds']:>7.3f}s "
+              f"{record['import_seconds']:>7.3f}s {run_seconds}  {heaviest}"
+              + (f"  ⚠️ {'; '.join(problems)}" if problems else ""))
+    return failures
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Check the startup time of the lab programs")
+    parser.add_argument('--programs', nargs='+', choices=PROGRAMS, default=PROGRAMS,
+                        help="programs to measure (default: all)")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help=f"startup seconds allowed per program (default: {DEFAULT_BUDGET})")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed starts per program; the fastest is kept (default: 3)")
+    parser.add_argument('--top', type=int, default=5,
+                        help="heaviest packages listed per program (default: 5)")
+    parser.add_argument('--data-dir', metavar='DIR',
+                        help="datasets for the text-only runs (default: the generator's "
+                             "defaults, written to a temporary directory)")
+    parser.add_argument('--output', metavar='PATH',
+                        help="also write the measurements, with per-package import times, as JSON")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix='startup_budget_') as tmp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = tmp_dir
+            generate_default_data(data_dir)
+        results = [measure(program, args.repeat, data_dir) for program in args.programs]
+    failures = report(results, args.budget, args.top)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'budget': args.budget, 'results': results}, f, indent=2)
+        print(f"✓ Saved {len(results)} results to {args.output}")
+    if failures:
+        raise SystemExit(f"{len(failures)} program(s) failed the startup budget")
+
+if __name__ == "__main__":
+    main()
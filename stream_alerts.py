@@ -0,0 +1,208 @@
+"""
+Streaming Performance Alerts
+Applies Program 4's drop thresholds to monthly performance records as they
+arrive (CSV lines on stdin or appended to a file) and prints an alert for
+every significant revenue or satisfaction drop
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from drop_rules import REVENUE_THRESHOLD, SATISFACTION_THRESHOLD
+
+# Seconds between checks for new lines when following a file
+POLL_INTERVAL = 0.2
+REQUIRED_COLUMNS = ['Month', 'Revenue', 'Customer_Satisfaction', 'Marketing_Budget',
+                    'Returns', 'Support_Tickets']
+
+def percent_change(new, old):
+    """Percent change from old to new, or None from a zero base.
+    
+    pandas' pct_change gives inf or NaN there, which never passes a drop
+    threshold, so a zero base counts as no change.
+    """
+    if old == 0:
+        return None
+    return (new / old - 1) * 100
+
+def _rounded(change):
+    return None if change is None else round(change, 1)
+
+class SeriesState:
+    """Everything kept per series: previous record and running means"""
+    
+    __slots__ = ('revenue', 'satisfaction', 'marketing', 'returns', 'tickets',
+                 'count', 'mean_returns', 'mean_tickets')
+    
+    def __init__(self):
+        self.revenue = None
+        self.count = 0
+        self.mean_returns = 0.0
+        self.mean_tickets = 0.0
+
+class DropDetector:
+    """Month-over-month drop detection with O(1) state per series.
+    
+    Uses the same thresholds and root-cause checks as program4, except that
+    "above average" compares against the running mean of the series' earlier
+    records, since later months are not known yet.
+    """
+    
+    def __init__(self, header, by=(), revenue_threshold=REVENUE_THRESHOLD,
+                 satisfaction_threshold=SATISFACTION_THRESHOLD):
+        position = {name: i for i, name in enumerate(header)}
+        missing = [col for col in list(by) + REQUIRED_COLUMNS if col not in position]
+        if missing:
+            raise ValueError(f"columns not in the input: {', '.join(missing)}")
+        self.by = [position[col] for col in by]
+        self.label = [position[col] for col in ('Year', 'Month') if col in position]
+        self.revenue = position['Revenue']
+        self.satisfaction = position['Customer_Satisfaction']
+        self.marketing = position['Marketing_Budget']
+        self.returns = position['Returns']
+        self.tickets = position['Support_Tickets']
+        self.revenue_threshold = revenue_threshold
+        self.satisfaction_threshold = satisfaction_threshold
+        self.width = len(header)
+        self.states = {}
+    
+    def update(self, fields):
+        """Process one record (a list of CSV fields); returns an alert dict or None.
+        
+        Raises ValueError for a record with missing or non-numeric fields,
+        leaving the state unchanged.
+        """
+        if len(fields) < self.width:
+            raise ValueError(f"expected {self.width} fields, got {len(fields)}")
+        revenue = float(fields[self.revenue])
+        satisfaction = float(fields[self.satisfaction])
+        marketing = float(fields[self.marketing])
+        returns = float(fields[self.returns])
+        tickets = float(fields[self.tickets])
+        key = tuple(fields[i] for i in self.by)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = SeriesState()
+        
+        alert = None
+        if state.revenue is not None:
+            revenue_change = percent_change(revenue, state.revenue)
+            satisfaction_change = satisfaction - state.satisfaction
+            if ((revenue_change is not None and revenue_change < self.revenue_threshold)
+                    or satisfaction_change < self.satisfaction_threshold):
+                alert = {
+                    'series': list(key),
+                    'month': " ".join(fields[i] for i in reversed(self.label)),
+                    'revenue': revenue,
+                    'revenue_change_pct': _rounded(revenue_change),
+                    'satisfaction': satisfaction,
+                    'satisfaction_change': round(satisfaction_change, 1),
+                    'high_returns': returns > state.mean_returns,
+                    'returns_increase_pct': _rounded(percent_change(returns, state.returns)),
+                    'high_tickets': tickets > state.mean_tickets,
+                    'tickets_increase_pct': _rounded(percent_change(tickets, state.tickets)),
+                    'marketing_change_pct': _rounded(percent_change(marketing, state.marketing)),
+                }
+        
+        state.count += 1
+        state.mean_returns += (returns - state.mean_returns) / state.count
+        state.mean_tickets += (tickets - state.mean_tickets) / state.count
+        state.revenue, state.satisfaction, state.marketing = revenue, satisfaction, marketing
+        state.returns, state.tickets = returns, tickets
+        return alert
+
+def _format_change(change):
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+def format_alert(alert):
+    """One-line text form of an alert"""
+    where = " ".join(alert['series'] + [alert['month']])
+    causes = []
+    if alert['high_returns']:
+        causes.append(f"high returns ({_format_change(alert['returns_increase_pct'])})")
+    if alert['high_tickets']:
+        causes.append(f"high support tickets ({_format_change(alert['tickets_increase_pct'])})")
+    marketing_change = alert['marketing_change_pct']
+    if marketing_change is not None and marketing_change < 0:
+        causes.append(f"marketing cut ({marketing_change:.1f}%)")
+    return (f"⚠️  {where}: revenue {_format_change(alert['revenue_change_pct'])}, "
+            f"satisfaction {alert['satisfaction_change']:+.1f}"
+            + (f" | {', '.join(causes)}" if causes else ""))
+
+def read_lines(stream, follow=False):
+    """Yield complete lines from a stream, waiting for more at EOF when following"""
+    pending = ""
+    while True:
+        line = stream.readline()
+        if not line:
+            if not follow:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+        pending += line
+        if pending.endswith("\n"):
+            yield pending.rstrip("\r\n")
+            pending = ""
+    if pending:
+        yield pending
+
+def run(lines, by=(), as_json=False, out=sys.stdout):
+    """Feed CSV lines (header first) through a DropDetector, printing alerts as they occur.
+    
+    Records that cannot be parsed are reported on stderr and skipped.
+    """
+    rows = csv.reader(lines)
+    header = next(rows, [])
+    detector = DropDetector(header, by)
+    records = alerts = 0
+    busy = 0.0
+    for fields in rows:
+        if not fields:
+            continue
+        start = time.perf_counter()
+        try:
+            alert = detector.update(fields)
+        except (ValueError, IndexError) as error:
+            print(f"stream_alerts: skipping line {rows.line_num}: {error}", file=sys.stderr)
+            continue
+        busy += time.perf_counter() - start
+        records += 1
+        if alert is not None:
+            alerts += 1
+            out.write((json.dumps(alert) if as_json else format_alert(alert)) + "\n")
+            out.flush()
+    return records, alerts, busy
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Streaming alerts for performance drops")
+    parser.add_argument('path', nargs='?', default='-',
+                        help="CSV file with a header line, or - for stdin (default)")
+    parser.add_argument('--follow', '-f', action='store_true',
+                        help="keep reading records appended to the file, like tail -f")
+    parser.add_argument('--by', nargs='+', default=[], metavar='COLUMN',
+                        help="key columns of separate series, e.g. Store")
+    parser.add_argument('--json', action='store_true',
+                        help="print alerts as JSON lines")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    stream = sys.stdin if args.path == '-' else open(args.path)
+    try:
+        records, alerts, busy = run(read_lines(stream, args.follow), args.by, args.json)
+    except KeyboardInterrupt:
+        return
+    except ValueError as error:
+        raise SystemExit(f"stream_alerts: {error}") from None
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if records:
+        print(f"{records:,} records, {alerts:,} alerts, "
+              f"{busy / records * 1e6:.1f} µs per record", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Streaming Statistics for Lab Programs
+Mergeable accumulators for data that is read in chunks and never held in
+memory at once: count/sum/min/max with Welford-style mean and variance
+(optionally per group), co-moment matrices, and an approximate quantile sketch
+"""
+
+import numpy as np
+import pandas as pd
+
+# Rows per block when folding a chunk into CoMoments; bounds the float64 and
+# centred copies to BLOCK_ROWS x n_columns however large the chunk is
+BLOCK_ROWS = 8192
+
+def _merge_moments(a, b):
+    """Combine two (count, mean, m2) triples with Chan et al.'s parallel formula.
+    
+    Works element-wise on arrays, so many groups/columns merge at once.
+    """
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    safe_n = np.where(n > 0, n, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / safe_n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+    return n, mean, m2
+
+class RunningStats:
+    """Mergeable count, sum, min, max, mean and variance of columns, optionally per group"""
+    
+    def __init__(self, columns, by=None):
+        self.columns = list(columns)
+        self.by = by
+        self._state = None
+        self._dtypes = {}
+    
+    def _chunk_state(self, chunk):
+        """Per-group statistics of a single chunk"""
+        keys = chunk[self.by] if self.by else np.zeros(len(chunk), dtype=np.int8)
+        # float64 keeps sums of narrow integer columns (int8 ages) from overflowing
+        grouped = chunk[self.columns].astype('float64').groupby(keys, observed=True)
+        stats = grouped.agg(['count', 'sum', 'min', 'max', 'mean', 'var']).astype('float64')
+        for col in self.columns:
+            # m2 = sum of squared deviations from the chunk mean
+            stats[(col, 'm2')] = (stats[(col, 'var')] * (stats[(col, 'count')] - 1)).fillna(0.0)
+        return stats.drop(columns=[(col, 'var') for col in self.columns])
+    
+    def update(self, chunk):
+        """Fold one DataFrame chunk into the running statistics"""
+        for col in self.columns:
+            self._dtypes.setdefault(col, chunk[col].dtype)
+        self._combine(self._chunk_state(chunk))
+        return self
+    
+    def merge(self, other):
+        """Fold another RunningStats (e.g. from a different file or process) into this one"""
+        self._dtypes = {**other._dtypes, **self._dtypes}
+        if other._state is not None:
+            self._combine(other._state)
+        return self
+    
+    def _combine(self, incoming):
+        if self._state is None:
+            self._state = incoming
+            return
+        index = self._state.index.union(incoming.index)
+        a = self._state.reindex(index)
+        b = incoming.reindex(index)
+        merged = {}
+        for col in self.columns:
+            n_a, n_b = a[(col, 'count')].fillna(0), b[(col, 'count')].fillna(0)
+            n, mean, m2 = _merge_moments(
+                (n_a, a[(col, 'mean')].fillna(0), a[(col, 'm2')].fillna(0)),
+                (n_b, b[(col, 'mean')].fillna(0), b[(col, 'm2')].fillna(0)))
+            merged[(col, 'count')] = n
+            merged[(col, 'sum')] = a[(col, 'sum')].fillna(0) + b[(col, 'sum')].fillna(0)
+            merged[(col, 'min')] = np.fmin(a[(col, 'min')], b[(col, 'min')])
+            merged[(col, 'max')] = np.fmax(a[(col, 'max')], b[(col, 'max')])
+            merged[(col, 'mean')] = mean
+            merged[(col, 'm2')] = m2
+        self._state = pd.DataFrame(merged, index=index)
+    
+    def _column(self, col, stat):
+        values = self._state[(col, stat)]
+        if stat in ('min', 'max') and pd.api.types.is_integer_dtype(self._dtypes.get(col)):
+            return values.astype('int64')
+        return values
+    
+    def count(self, col):
+        return self._column(col, 'count').astype('int64')
+    
+    def sum(self, col):
+        return self._column(col, 'sum')
+    
+    def min(self, col):
+        return self._column(col, 'min')
+    
+    def max(self, col):
+        return self._column(col, 'max')
+    
+    def mean(self, col):
+        return self._column(col, 'mean')
+    
+    def var(self, col, ddof=1):
+        n = self._column(col, 'count')
+        return self._column(col, 'm2') / (n - ddof).where(n > ddof)
+    
+    def std(self, col, ddof=1):
+        return np.sqrt(self.var(col, ddof))
+    
+    def total(self, stat, col):
+        """Value of a statistic for an ungrouped accumulator"""
+        return getattr(self, stat)(col).iloc[0]
+
+class CoMoments:
+    """Mergeable count, means and co-moment matrix of several columns.
+    
+    comoment[i, j] is the sum of (x_i - mean_i) * (x_j - mean_j), so the
+    covariance, correlation and least-squares fits of the columns follow
+    from this state alone. Rows can be added, removed again (downdated)
+    and accumulators merged, using the same pairwise update as RunningStats.
+    Each block of rows costs one matrix product, so hundreds of columns
+    stay cheap. Rows with a missing value in any column are skipped.
+    """
+    
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.n = 0.0
+        self.mean = np.zeros(len(self.columns))
+        self.comoment = np.zeros((len(self.columns), len(self.columns)))
+    
+    @staticmethod
+    def _batch(values):
+        """(count, mean, comoment) of a 2-D block of rows"""
+        mean = values.mean(axis=0) if len(values) else np.zeros(values.shape[1])
+        centred = values - mean
+        return float(len(values)), mean, centred.T @ centred
+    
+    def _rows(self, values):
+        """(count, mean, comoment) of rows given as a DataFrame or 2-D array"""
+        if isinstance(values, pd.DataFrame):
+            values = values[self.columns]
+        else:
+            values = np.asarray(values).reshape(-1, len(self.columns))
+        block = CoMoments(self.columns)
+        for start in range(0, len(values), BLOCK_ROWS):
+            rows = (values.iloc[start:start + BLOCK_ROWS] if isinstance(values, pd.DataFrame)
+                    else values[start:start + BLOCK_ROWS])
+            rows = np.asarray(rows, dtype='float64')
+            block._combine(*self._batch(rows[~np.isnan(rows).any(axis=1)]))
+        return block.n, block.mean, block.comoment
+    
+    def add(self, values):
+        """Fold rows (a DataFrame with these columns or a 2-D array) into the state"""
+        self._combine(*self._rows(values))
+        return self
+    
+    def merge(self, other):
+        """Fold another CoMoments over the same columns into this one"""
+        self._combine(other.n, other.mean, other.comoment)
+        return self
+    
+    def remove(self, values):
+        """Take previously added rows out of the state again"""
+        n_b, mean_b, m_b = self._rows(values)
+        n_a = self.n - n_b
+        if n_a <= 0:
+            self.__init__(self.columns)
+            return self
+        mean_a = (self.n * self.mean - n_b * mean_b) / n_a
+        delta = mean_b - mean_a
+        self.comoment = self.comoment - m_b - np.outer(delta, delta) * n_a * n_b / self.n
+        self.n, self.mean = n_a, mean_a
+        return self
+    
+    def _combine(self, n_b, mean_b, m_b):
+        if n_b == 0:
+            return
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.comoment = self.comoment + m_b + np.outer(delta, delta) * self.n * n_b / n
+        self.mean = self.mean + delta * n_b / n
+        self.n = n
+    
+    def covariance(self, ddof=1):
+        return pd.DataFrame(self.comoment / (self.n - ddof), index=self.columns,
+                            columns=self.columns)
+    
+    def correlation(self):
+        """Pearson correlation matrix over complete rows only.
+        
+        Missing values are dropped listwise (a row with a NaN anywhere is left
+        out of every pair), whereas DataFrame.corr() drops them pair by pair;
+        the two agree when no value is missing.
+        """
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+    
+    def pair(self, a, b):
+        """Correlation of two columns over the same complete rows, without another pass"""
+        i, j = self.columns.index(a), self.columns.index(b)
+        denominator = np.sqrt(self.comoment[i, i] * self.comoment[j, j])
+        return self.comoment[i, j] / denominator if denominator > 0 else np.nan
+    
+    def state(self):
+        """Arrays to persist, e.g. with np.savez"""
+        return {'n': np.array(self.n), 'mean': self.mean, 'comoment': self.comoment}
+    
+    @classmethod
+    def from_state(cls, columns, n, mean, comoment):
+        moments = cls(columns)
+        moments.n, moments.mean, moments.comoment = float(n), np.asarray(mean), np.asarray(comoment)
+        return moments
+
+class QuantileSketch:
+    """Approximate quantiles from a bounded set of weighted centroids.
+    
+    Distinct values are counted exactly until there are more than
+    max_centroids of them; after that neighbouring centroids are merged
+    pairwise (weighted mean), so memory stays O(max_centroids). Columns
+    with few distinct values, like ages, keep exact quantiles.
+    """
+    
+    def __init__(self, max_centroids=4096):
+        self.max_centroids = max_centroids
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+        self.exact = True
+    
+    def update(self, values):
+        """Add a batch of observations"""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        uniq, counts = np.unique(values, return_counts=True)
+        self._add(uniq, counts.astype('float64'))
+        return self
+    
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        self.exact = self.exact and other.exact
+        self._add(other.values, other.weights)
+        return self
+    
+    def _add(self, values, weights):
+        values = np.concatenate([self.values, values])
+        weights = np.concatenate([self.weights, weights])
+        uniq, inverse = np.unique(values, return_inverse=True)
+        self.values = uniq
+        self.weights = np.bincount(inverse, weights=weights)
+        while len(self.values) > self.max_centroids:
+            self._compress()
+    
+    def _compress(self):
+        """Halve the number of centroids by merging neighbours"""
+        self.exact = False
+        n = len(self.values) // 2 * 2
+        w = self.weights[:n].reshape(-1, 2)
+        v = self.values[:n].reshape(-1, 2)
+        merged_w = w.sum(axis=1)
+        merged_v = (v * w).sum(axis=1) / merged_w
+        self.values = np.concatenate([merged_v, self.values[n:]])
+        self.weights = np.concatenate([merged_w, self.weights[n:]])
+    
+    def quantile(self, q):
+        """Quantile with pandas' default linear interpolation between order statistics"""
+        q = np.atleast_1d(np.asarray(q, dtype='float64'))
+        total = self.weights.sum()
+        if total == 0:
+            return np.full(len(q), np.nan)
+        cum = np.cumsum(self.weights)
+        pos = q * (total - 1)
+        lower = np.floor(pos)
+        lo_val = self.values[np.searchsorted(cum, lower, side='right')]
+        hi_val = self.values[np.minimum(np.searchsorted(cum, lower + 1, side='right'),
+                                        len(self.values) - 1)]
+        return lo_val + (hi_val - lo_val) * (pos - lower)
+
+def describe_from(stats, sketches, percentiles=(0.25, 0.5, 0.75)):
+    """DataFrame.describe()-style table from an ungrouped RunningStats and sketches"""
+    labels = [f'{p * 100:g}%' for p in percentiles]
+    table = {}
+    for col in stats.columns:
+        quantiles = sketches[col].quantile(percentiles)
+        table[col] = ([float(stats.total('count', col)), stats.total('mean', col),
+                       stats.total('std', col), float(stats.total('min', col))]
+                      + list(quantiles) + [float(stats.total('max', col))])
+    return pd.DataFrame(table, index=['count', 'mean', 'std', 'min'] + labels + ['max'])
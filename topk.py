@@ -0,0 +1,91 @@
+"""
+Streaming Top-K Selection for Lab Programs
+Keeps the k largest (or smallest) rows of a table by a column, overall or
+per group, while the table is read chunk by chunk, so several rankings of
+a catalogue that does not fit in memory can be built in a single pass
+"""
+
+import numpy as np
+import pandas as pd
+
+# Helper column with each row's position in the whole table
+ROW = '_row'
+
+class TopK:
+    """Mergeable top-k rows of a table by one column, optionally per group.
+    
+    Only the current k best rows (per group) are kept between chunks, so
+    memory is O(k) per group whatever the table size. Each chunk is cut
+    down by partial selection before it is merged with the kept rows.
+    Ties go to the row that comes first, like DataFrame.nlargest, and rows
+    with a missing value in the column are skipped.
+    """
+    
+    def __init__(self, k, column, by=None, largest=True):
+        self.k = k
+        self.column = column
+        self.by = by
+        self.largest = largest
+        self.n_rows = 0
+        self._rows = None
+    
+    def update(self, chunk):
+        """Fold one DataFrame chunk, the next rows of the table, into the top k"""
+        rows = chunk.assign(**{ROW: np.arange(self.n_rows, self.n_rows + len(chunk))})
+        self.n_rows += len(chunk)
+        rows = rows[rows[self.column].notna()]
+        if self.by is None and len(rows) > self.k:
+            # Partial selection: everything at least as good as the k-th value,
+            # ties included so the earliest rows can win them
+            values = rows[self.column].to_numpy()
+            if self.largest:
+                kth = np.partition(values, len(values) - self.k)[len(values) - self.k]
+                rows = rows[values >= kth]
+            else:
+                kth = np.partition(values, self.k - 1)[self.k - 1]
+                rows = rows[values <= kth]
+        self._select(rows)
+        return self
+    
+    def merge(self, other):
+        """Fold in a TopK over the rows that follow this one's, e.g. the next file"""
+        if other._rows is not None:
+            rows = other._rows.assign(**{ROW: other._rows[ROW] + self.n_rows})
+            self._select(rows)
+        self.n_rows += other.n_rows
+        return self
+    
+    def _select(self, rows):
+        """Keep the best k of the kept and the new rows, per group"""
+        if self._rows is not None:
+            rows = pd.concat([self._rows, rows], ignore_index=True)
+        values = rows[self.column].to_numpy()
+        keys = [rows[ROW].to_numpy(), -values if self.largest else values]
+        if self.by is not None:
+            codes = rows.groupby(self.by, sort=True, observed=True).ngroup().to_numpy()
+            keys.append(codes)
+        order = np.lexsort(keys)
+        if self.by is None:
+            order = order[:self.k]
+        else:
+            # Rank within the group: distance from the group's first sorted row
+            codes = codes[order]
+            rank = np.arange(len(codes)) - np.searchsorted(codes, codes, side='left')
+            order = order[rank < self.k]
+        self._rows = rows.iloc[order].reset_index(drop=True)
+    
+    def result(self):
+        """The kept rows, best first (within each group, groups in sorted order)"""
+        if self._rows is None:
+            return pd.DataFrame()
+        return self._rows.drop(columns=ROW)
+
+def streaming_top(chunks, rankings):
+    """Feed every chunk to each TopK of a {name: TopK} dict, in one pass.
+    
+    Returns {name: result DataFrame}.
+    """
+    for chunk in chunks:
+        for ranking in rankings.values():
+            ranking.update(chunk)
+    return {name: ranking.result() for name, ranking in rankings.items()}